@@ -0,0 +1,202 @@
+"""Asynchronous entry point for the Slack events endpoint.
+
+Runs the same /api/slack/events handling as events.py on aiohttp, with
+slack_sdk's AsyncWebClient sharing one aiohttp.ClientSession, so thousands of
+events can be in flight without a thread per request. events.py (Flask)
+stays the compatibility path.
+
+    python api/slack/async_events.py
+    gunicorn async_events:create_app --chdir api/slack --worker-class aiohttp.GunicornWebWorker
+
+See docs/async-server.md for how it compares with the Flask server.
+"""
+import asyncio
+import functools
+import json
+import os
+
+import aiohttp
+from aiohttp import web
+from dotenv import load_dotenv
+from slack_sdk.http_retry.builtin_async_handlers import AsyncRateLimitErrorRetryHandler
+from slack_sdk.signature import SignatureVerifier
+from slack_sdk.web.async_client import AsyncWebClient
+
+from dedup import EventDeduplicator, make_event_index
+from dispatcher import AsyncEventDispatcher, QUEUE_FULL_DROP
+from router import EventRouter
+from user_cache import AsyncUserCache
+
+# Load environment variables
+load_dotenv('.env.development.local')
+
+SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
+SLACK_API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api/")
+SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET")
+signature_verifier = SignatureVerifier(SLACK_SIGNING_SECRET)
+
+# One event loop can keep far more handlers in flight than the thread pool
+SLACK_ASYNC_WORKERS = int(os.getenv("SLACK_ASYNC_WORKERS", "100"))
+SLACK_ASYNC_CONNECTIONS = int(os.getenv("SLACK_ASYNC_CONNECTIONS", "100"))
+SLACK_EVENT_QUEUE_SIZE = int(os.getenv("SLACK_EVENT_QUEUE_SIZE", "1000"))
+SLACK_EVENT_QUEUE_FULL = os.getenv("SLACK_EVENT_QUEUE_FULL", QUEUE_FULL_DROP)
+SLACK_OUTBOUND_MAX_RETRIES = int(os.getenv("SLACK_OUTBOUND_MAX_RETRIES", "3"))
+SLACK_USER_CACHE_SIZE = int(os.getenv("SLACK_USER_CACHE_SIZE", "5000"))
+SLACK_USER_CACHE_TTL = float(os.getenv("SLACK_USER_CACHE_TTL", "3600"))
+SLACK_USER_CACHE_WARM = os.getenv("SLACK_USER_CACHE_WARM", "false").lower() in ("1", "true", "yes")
+SLACK_DEDUP_BACKEND = os.getenv("SLACK_DEDUP_BACKEND", "memory")
+SLACK_DEDUP_PATH = os.getenv("SLACK_DEDUP_PATH", "slack_events.db")
+SLACK_DEDUP_WINDOW = float(os.getenv("SLACK_DEDUP_WINDOW", "3600"))
+SLACK_DEDUP_MAX_ENTRIES = int(os.getenv("SLACK_DEDUP_MAX_ENTRIES", "100000"))
+
+event_deduplicator = EventDeduplicator(make_event_index(
+    SLACK_DEDUP_BACKEND,
+    path=SLACK_DEDUP_PATH,
+    window=SLACK_DEDUP_WINDOW,
+    max_entries=SLACK_DEDUP_MAX_ENTRIES,
+))
+
+
+async def _in_dedup_thread(func, *args):
+    # The SQLite index writes to disk on every check; keep that off the event loop
+    if SLACK_DEDUP_BACKEND == "sqlite":
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+    return func(*args)
+
+
+SLACK_CLIENT_KEY = web.AppKey("slack_client", AsyncWebClient)
+USER_CACHE_KEY = web.AppKey("user_cache", AsyncUserCache)
+DISPATCHER_KEY = web.AppKey("event_dispatcher", AsyncEventDispatcher)
+# asyncio only keeps weak references to tasks, so the app holds the warm-up
+WARM_TASK_KEY = web.AppKey("user_cache_warm", asyncio.Task)
+
+
+event_router = EventRouter()
+
+
+# Keep cached profiles fresh when users edit them or join the workspace
+@event_router.route("user_change")
+@event_router.route("team_join")
+async def refresh_user(app, event, match):
+    app[USER_CACHE_KEY].handle_event(event)
+
+
+# Respond to "hello" in any channel or DM
+@event_router.route("message", text="hello")
+async def say_hello(app, event, match):
+    user_name = (await app[USER_CACHE_KEY].get(event.get("user")))["real_name"]
+    await app[SLACK_CLIENT_KEY].chat_postMessage(
+        channel=event.get("channel"),
+        text=f"Hello, {user_name}! Nice one, I work as expected."
+    )
+
+
+async def handle_event(app, data):
+    """Async twin of events.handle_event."""
+    resolved = event_router.resolve(data)
+    if resolved is None:
+        return False
+    handler, match = resolved
+    await handler(app, data.get("event") or {}, match)
+    return True
+
+
+async def slack_events(request):
+    # --- Signature Verification ---
+    request_body = await request.read()
+    slack_signature = request.headers['X-Slack-Signature']
+    timestamp = request.headers['X-Slack-Request-Timestamp']
+
+    # if not signature_verifier.is_valid_request(request_body, slack_signature, timestamp):
+    #     return web.json_response({'status': 'invalid_request'}, status=403)
+
+    # --- Duplicate Handling ---
+    if await _in_dedup_thread(event_deduplicator.is_duplicate, request_body, request.headers):
+        return web.json_response({'status': 'duplicate'})
+
+    # Any error answer asks Slack to redeliver, so the event_id must not stick
+    try:
+        response = await _process_event(request, request_body)
+    except Exception:
+        await _in_dedup_thread(event_deduplicator.forget, request_body)
+        raise
+    if response.status >= 300:
+        await _in_dedup_thread(event_deduplicator.forget, request_body)
+    return response
+
+
+async def _process_event(request, request_body):
+    # --- Challenge Handling ---
+    if request.content_type == 'application/json':
+        data = json.loads(request_body)
+
+        if data.get("type") == "url_verification":
+            return web.json_response({"challenge": data.get("challenge")})
+
+        # --- Event Handling ---
+        if data.get("type") == "event_callback":
+            if not event_router.accepts(data):
+                return web.json_response({'status': 'ignored'})
+
+            if await request.app[DISPATCHER_KEY].submit(data):
+                return web.json_response({'status': 'ok'})
+            return web.json_response({'status': 'busy'}, status=503)
+
+    return web.json_response({'status': 'event_not_processed'}, status=400)
+
+
+async def slack_event_stats(request):
+    app = request.app
+    return web.json_response({
+        "queue": app[DISPATCHER_KEY].stats(),
+        "user_cache": app[USER_CACHE_KEY].stats(),
+        "dedup": await _in_dedup_thread(event_deduplicator.stats),
+    })
+
+
+async def _start_slack(app):
+    # One pooled session for every Web API call made by this process
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=SLACK_ASYNC_CONNECTIONS)
+    )
+    client = AsyncWebClient(
+        token=SLACK_BOT_TOKEN,
+        base_url=SLACK_API_URL,
+        session=session,
+        retry_handlers=[AsyncRateLimitErrorRetryHandler(max_retry_count=SLACK_OUTBOUND_MAX_RETRIES)],
+    )
+    app[SLACK_CLIENT_KEY] = client
+    app[USER_CACHE_KEY] = AsyncUserCache(client, max_size=SLACK_USER_CACHE_SIZE,
+                                         ttl=SLACK_USER_CACHE_TTL)
+    warm_task = None
+    if SLACK_USER_CACHE_WARM:
+        warm_task = app[WARM_TASK_KEY] = app[USER_CACHE_KEY].warm_in_background()
+
+    app[DISPATCHER_KEY] = AsyncEventDispatcher(
+        functools.partial(handle_event, app),
+        workers=SLACK_ASYNC_WORKERS,
+        max_queue=SLACK_EVENT_QUEUE_SIZE,
+        on_full=SLACK_EVENT_QUEUE_FULL,
+    )
+    app[DISPATCHER_KEY].start()
+
+    yield
+
+    # Drain queued events before closing the shared session
+    if warm_task is not None:
+        warm_task.cancel()
+        await asyncio.gather(warm_task, return_exceptions=True)
+    await app[DISPATCHER_KEY].shutdown()
+    await session.close()
+
+
+def create_app():
+    app = web.Application()
+    app.router.add_post('/api/slack/events', slack_events)
+    app.router.add_get('/api/slack/events/stats', slack_event_stats)
+    app.cleanup_ctx.append(_start_slack)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), port=int(os.getenv("PORT", "3000")))
@@ -0,0 +1,176 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Pulls event_id out of the raw body so repeats are dropped before JSON parsing
+_EVENT_ID_RE = re.compile(rb'"event_id"\s*:\s*"([^"]+)"')
+
+
+def extract_event_id(body):
+    match = _EVENT_ID_RE.search(body)
+    return match.group(1).decode() if match else None
+
+
+class MemoryEventIndex:
+    """Remembers recent event_ids in a ring buffer backed by a dict.
+
+    Memory is capped by max_entries; entries older than window seconds are
+    forgotten, which covers Slack's retry schedule (1 min, 5 min, 30 min).
+    """
+
+    def __init__(self, window=3600.0, max_entries=100000):
+        self.window = window
+        self.max_entries = max(1, int(max_entries))
+        self._order = deque()
+        # event_id -> when it was recorded; forget() can leave stale entries in _order
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def seen(self, event_id):
+        """Record event_id and return True if it was already recorded."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if event_id in self._ids:
+                return True
+            while len(self._ids) >= self.max_entries:
+                self._pop_oldest()
+            self._order.append((now, event_id))
+            self._ids[event_id] = now
+            return False
+
+    def forget(self, event_id):
+        """Drop event_id so its next delivery is not treated as a duplicate."""
+        with self._lock:
+            self._ids.pop(event_id, None)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self._order and self._order[0][0] < cutoff:
+            self._pop_oldest()
+
+    def _pop_oldest(self):
+        seen_at, event_id = self._order.popleft()
+        # Only if it wasn't forgotten and recorded again since
+        if self._ids.get(event_id) == seen_at:
+            del self._ids[event_id]
+
+
+class SQLiteEventIndex:
+    """event_id index in a local SQLite file, shared by every worker process."""
+
+    def __init__(self, path, window=3600.0, max_entries=100000, prune_every=1000):
+        self.window = window
+        self.max_entries = max(1, int(max_entries))
+        self.prune_every = prune_every
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS slack_events "
+            "(event_id TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS slack_events_seen_at ON slack_events (seen_at)"
+        )
+
+    def seen(self, event_id):
+        # Wall-clock time, since monotonic clocks aren't comparable across processes
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO slack_events (event_id, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(event_id) DO UPDATE SET seen_at = excluded.seen_at "
+                "WHERE slack_events.seen_at < ?",
+                (event_id, now, now - self.window),
+            )
+            # rowcount is 0 only when the row exists and is still inside the window
+            duplicate = cursor.rowcount == 0
+            if not duplicate:
+                self._inserts += 1
+                if self._inserts % self.prune_every == 0:
+                    self._prune(now)
+            return duplicate
+
+    def forget(self, event_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM slack_events WHERE event_id = ?", (event_id,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM slack_events").fetchone()[0]
+
+    def _prune(self, now):
+        self._conn.execute("DELETE FROM slack_events WHERE seen_at < ?", (now - self.window,))
+        self._conn.execute(
+            "DELETE FROM slack_events WHERE event_id IN ("
+            "SELECT event_id FROM slack_events ORDER BY seen_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+def make_event_index(backend="memory", path=None, window=3600.0, max_entries=100000):
+    if backend == "memory":
+        return MemoryEventIndex(window=window, max_entries=max_entries)
+    if backend == "sqlite":
+        return SQLiteEventIndex(path or "slack_events.db", window=window,
+                                max_entries=max_entries)
+    raise ValueError(f"Unknown event index backend: {backend!r}")
+
+
+class EventDeduplicator:
+    """Drops redelivered events by event_id and keeps counters on retries.
+
+    is_duplicate() records the event_id as it checks it. If the request then
+    fails (any non-2xx answer asks Slack to redeliver), call forget() so the
+    redelivery is handled instead of being acked as a duplicate.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self._lock = threading.Lock()
+        self._counters = {"checked": 0, "duplicates": 0, "retries": 0, "forgotten": 0}
+        self._retry_reasons = {}
+
+    def is_duplicate(self, body, headers):
+        retry_num = headers.get("X-Slack-Retry-Num")
+        if retry_num is not None:
+            reason = headers.get("X-Slack-Retry-Reason", "unknown")
+            with self._lock:
+                self._counters["retries"] += 1
+                self._retry_reasons[reason] = self._retry_reasons.get(reason, 0) + 1
+
+        event_id = extract_event_id(body)
+        if event_id is None:
+            return False
+
+        duplicate = self.index.seen(event_id)
+        with self._lock:
+            self._counters["checked"] += 1
+            if duplicate:
+                self._counters["duplicates"] += 1
+        return duplicate
+
+    def forget(self, body):
+        """Un-record the event in body, e.g. after answering Slack with an error."""
+        event_id = extract_event_id(body)
+        if event_id is None:
+            return
+        self.index.forget(event_id)
+        with self._lock:
+            self._counters["forgotten"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["retry_reasons"] = dict(self._retry_reasons)
+        stats["tracked"] = len(self.index)
+        return stats
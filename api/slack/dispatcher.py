@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+
+# What to do with a new event when the queue is already full
+QUEUE_FULL_DROP = "drop"        # ack anyway and discard the event
+QUEUE_FULL_REJECT = "reject"    # answer 503 so Slack redelivers later
+QUEUE_FULL_BLOCK = "block"      # wait up to block_timeout for a free slot, then drop
+QUEUE_FULL_POLICIES = (QUEUE_FULL_DROP, QUEUE_FULL_REJECT, QUEUE_FULL_BLOCK)
+
+_STOP = object()
+
+
+class EventDispatcher:
+    """Bounded in-process queue drained by a pool of worker threads.
+
+    The HTTP route only calls submit() and returns, so Slack gets its ack
+    well inside the 3 second deadline no matter how slow the handlers are.
+    The owner calls shutdown() on exit (see shutdown_on_signals) to drain
+    what is queued.
+    """
+
+    def __init__(self, handler, workers=4, max_queue=1000,
+                 on_full=QUEUE_FULL_DROP, block_timeout=1.0):
+        if on_full not in QUEUE_FULL_POLICIES:
+            raise ValueError(f"Unknown queue-full policy: {on_full!r}")
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.on_full = on_full
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._threads = []
+        # Reentrant: the signal handler's shutdown() can interrupt submit() on the
+        # main thread while it holds the lock, and must then time out, not deadlock
+        self._lock = threading.RLock()
+        # Signalled when the last in-progress submit() has put its item
+        self._submits_done = threading.Condition(self._lock)
+        self._submitting = 0
+        self._accepting = False
+        self._busy = 0
+        self._counters = {
+            "submitted": 0,
+            "processed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "rejected": 0,
+        }
+        self._max_depth = 0
+        self._total_wait = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._accepting:
+                return
+            self._accepting = True
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"slack-event-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, payload):
+        """Queue a payload for the workers.
+
+        Returns True if the event was queued (or deliberately dropped, which
+        still means "ack it"), False if the caller should reject the request.
+        """
+        with self._lock:
+            if not self._accepting:
+                self._counters["rejected"] += 1
+                return False
+            # shutdown() waits for this before queueing the stop sentinels
+            self._submitting += 1
+
+        item = (time.monotonic(), payload)
+        try:
+            if self.on_full == QUEUE_FULL_BLOCK:
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+            queued = True
+        except queue.Full:
+            queued = False
+        finally:
+            with self._lock:
+                self._submitting -= 1
+                if not self._submitting:
+                    self._submits_done.notify_all()
+
+        if not queued:
+            if self.on_full == QUEUE_FULL_REJECT:
+                self._count("rejected")
+                return False
+            self._count("dropped")
+            logging.warning("Event queue full, dropping event")
+            return True
+
+        with self._lock:
+            self._counters["submitted"] += 1
+            self._max_depth = max(self._max_depth, self._queue.qsize())
+        return True
+
+    def shutdown(self, timeout=10.0):
+        """Stop accepting events and let the workers drain what is queued."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            if not self._accepting:
+                return
+            self._accepting = False
+            # Let submits that already passed the check land ahead of the sentinels
+            while self._submitting and self._submits_done.wait(deadline - time.monotonic()):
+                pass
+        for _ in self._threads:
+            # Sentinels go in after the queued events, so everything is drained first
+            try:
+                self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in self._threads):
+            logging.warning("Timed out draining %d queued events", self._queue.qsize())
+        self._threads = []
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            processed = stats["processed"] + stats["failed"]
+            stats.update(
+                depth=self._queue.qsize(),
+                capacity=self._queue.maxsize,
+                max_depth=self._max_depth,
+                busy_workers=self._busy,
+                workers=self.workers,
+                avg_wait_ms=(self._total_wait / processed * 1000) if processed else 0.0,
+            )
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            enqueued_at, payload = item
+            with self._lock:
+                self._busy += 1
+                self._total_wait += time.monotonic() - enqueued_at
+            try:
+                self.handler(payload)
+                outcome = "processed"
+            except Exception:
+                logging.exception("Error handling queued event")
+                outcome = "failed"
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                self._queue.task_done()
+            self._count(outcome)
+
+
+def shutdown_on_signals(callback, signals=(signal.SIGTERM, signal.SIGINT)):
+    """Run callback (e.g. a dispatcher's shutdown) when the process is told to stop.
+
+    atexit hooks don't run when a process manager sends SIGTERM and the
+    default handler kills the process, so queued events would be lost.
+    Whatever handler was installed before runs afterwards, so the process
+    still exits the way it would have. Only works from the main thread;
+    elsewhere (e.g. inside a server that owns the signals) it does nothing.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return False
+
+    for signum in signals:
+        previous = signal.getsignal(signum)
+
+        def handler(signum, frame, previous=previous):
+            callback()
+            if callable(previous):
+                previous(signum, frame)
+            elif previous == signal.SIG_DFL:
+                signal.signal(signum, signal.SIG_DFL)
+                os.kill(os.getpid(), signum)
+
+        signal.signal(signum, handler)
+    return True
+
+
+class AsyncEventDispatcher:
+    """asyncio counterpart of EventDispatcher for the aiohttp entry point.
+
+    Same queue-full policies and stats; the handler is a coroutine function
+    and the workers are tasks on the running event loop.
+    """
+
+    def __init__(self, handler, workers=100, max_queue=1000,
+                 on_full=QUEUE_FULL_DROP, block_timeout=1.0):
+        if on_full not in QUEUE_FULL_POLICIES:
+            raise ValueError(f"Unknown queue-full policy: {on_full!r}")
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.on_full = on_full
+        self.block_timeout = block_timeout
+        self._queue = None
+        self._tasks = []
+        self._accepting = False
+        self._busy = 0
+        self._counters = {
+            "submitted": 0,
+            "processed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "rejected": 0,
+        }
+        self._max_depth = 0
+        self._total_wait = 0.0
+
+    def start(self):
+        if self._accepting:
+            return
+        # Created here so the queue belongs to the loop the app runs on
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._accepting = True
+        self._tasks = [
+            asyncio.get_running_loop().create_task(self._run()) for _ in range(self.workers)
+        ]
+
+    async def submit(self, payload):
+        if not self._accepting:
+            self._counters["rejected"] += 1
+            return False
+
+        item = (time.monotonic(), payload)
+        try:
+            if self.on_full == QUEUE_FULL_BLOCK:
+                await asyncio.wait_for(self._queue.put(item), self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            if self.on_full == QUEUE_FULL_REJECT:
+                self._counters["rejected"] += 1
+                return False
+            self._counters["dropped"] += 1
+            logging.warning("Event queue full, dropping event")
+            return True
+
+        self._counters["submitted"] += 1
+        self._max_depth = max(self._max_depth, self._queue.qsize())
+        return True
+
+    async def shutdown(self, timeout=10.0):
+        if not self._accepting:
+            return
+        self._accepting = False
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning("Timed out draining %d queued events", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self):
+        stats = dict(self._counters)
+        processed = stats["processed"] + stats["failed"]
+        stats.update(
+            depth=self._queue.qsize() if self._queue else 0,
+            capacity=self.max_queue,
+            max_depth=self._max_depth,
+            busy_workers=self._busy,
+            workers=self.workers,
+            avg_wait_ms=(self._total_wait / processed * 1000) if processed else 0.0,
+        )
+        return stats
+
+    async def _run(self):
+        while True:
+            enqueued_at, payload = await self._queue.get()
+            self._busy += 1
+            self._total_wait += time.monotonic() - enqueued_at
+            try:
+                await self.handler(payload)
+                self._counters["processed"] += 1
+            except Exception:
+                logging.exception("Error handling queued event")
+                self._counters["failed"] += 1
+            finally:
+                self._busy -= 1
+                self._queue.task_done()
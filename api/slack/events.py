@@ -1,12 +1,34 @@
-from flask import Flask, request, jsonify, redirect
-from slack_sdk import WebClient
+from flask import Flask, Response, request, jsonify, redirect
+from slack_sdk.http_retry import ConnectionErrorRetryHandler
 from slack_sdk.signature import SignatureVerifier
 from slack_sdk.errors import SlackApiError
+from slack_sdk.oauth import AuthorizeUrlGenerator
+from slack_sdk.oauth.token_rotation import TokenRotator
+import atexit
 import os
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from urllib.parse import parse_qs
 import logging
 
+from dispatcher import EventDispatcher, QUEUE_FULL_DROP, shutdown_on_signals
+from user_cache import UserCache
+from dedup import EventDeduplicator, make_event_index
+from outbound import OutboundScheduler, parse_tier_rates
+from router import EventRouter
+from transport import PooledWebClient
+from installations import (
+    TeamClients,
+    installation_from_oauth,
+    installation_key,
+    make_installation_store,
+    make_state_store,
+)
+from metrics import CONTENT_TYPE, REGISTRY, Histogram, StatsGauges
+import logfmt
+
+log = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv('.env.development.local') 
 
@@ -15,31 +37,252 @@ SLACK_CLIENT_SECRET = os.getenv("SLACK_CLIENT_SECRET")
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET")
 SLACK_AUTH_SECRET=os.getenv("SLACK_AUTH_SECRET")
-web_client = WebClient(token=SLACK_BOT_TOKEN)
+SLACK_API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api/")
+
+# Keep-alive connection pool shared by every thread making Web API calls
+SLACK_HTTP_POOL_SIZE = int(os.getenv("SLACK_HTTP_POOL_SIZE", "10"))
+SLACK_HTTP_IDLE_TIMEOUT = float(os.getenv("SLACK_HTTP_IDLE_TIMEOUT", "30"))
+SLACK_HTTP_MAX_RETRIES = int(os.getenv("SLACK_HTTP_MAX_RETRIES", "2"))
+
+web_client = PooledWebClient(
+    token=SLACK_BOT_TOKEN,
+    base_url=SLACK_API_URL,
+    pool_size=SLACK_HTTP_POOL_SIZE,
+    idle_timeout=SLACK_HTTP_IDLE_TIMEOUT,
+    retry_handlers=[ConnectionErrorRetryHandler(max_retry_count=SLACK_HTTP_MAX_RETRIES)],
+)
 signature_verifier = SignatureVerifier(SLACK_SIGNING_SECRET)
 
+# Outbound calls go through the scheduler so we stay inside Slack's rate limits
+SLACK_OUTBOUND_SENDERS = int(os.getenv("SLACK_OUTBOUND_SENDERS", "2"))
+SLACK_OUTBOUND_MAX_RETRIES = int(os.getenv("SLACK_OUTBOUND_MAX_RETRIES", "3"))
+SLACK_OUTBOUND_COALESCE = os.getenv("SLACK_OUTBOUND_COALESCE", "true").lower() in ("1", "true", "yes")
+# Requests per minute by tier, e.g. "2=20,4=100"; unlisted tiers keep Slack's published limits
+SLACK_OUTBOUND_TIER_RATES = parse_tier_rates(os.getenv("SLACK_OUTBOUND_TIER_RATES"))
+SLACK_OUTBOUND_CHAT_RATE = float(os.getenv("SLACK_OUTBOUND_CHAT_RATE", "300"))
+SLACK_OUTBOUND_BURST_SECONDS = float(os.getenv("SLACK_OUTBOUND_BURST_SECONDS", "60"))
+
+
+def make_scheduler(client, senders):
+    return OutboundScheduler(
+        client,
+        max_retries=SLACK_OUTBOUND_MAX_RETRIES,
+        senders=senders,
+        coalesce=SLACK_OUTBOUND_COALESCE,
+        tier_rates=SLACK_OUTBOUND_TIER_RATES,
+        chat_rate=SLACK_OUTBOUND_CHAT_RATE,
+        burst_seconds=SLACK_OUTBOUND_BURST_SECONDS,
+    )
+
+
+slack_client = make_scheduler(web_client, SLACK_OUTBOUND_SENDERS)
+
+# Multi-workspace installs: OAuth flow, installation store and cached per-team clients
+SLACK_SCOPES = os.getenv("SLACK_SCOPES", "chat:write,users:read,channels:history,im:history").split(",")
+SLACK_USER_SCOPES = [scope for scope in os.getenv("SLACK_USER_SCOPES", "").split(",") if scope]
+SLACK_REDIRECT_URI = os.getenv("SLACK_REDIRECT_URI")
+SLACK_INSTALLATION_BACKEND = os.getenv("SLACK_INSTALLATION_BACKEND", "file")
+SLACK_INSTALLATION_PATH = os.getenv("SLACK_INSTALLATION_PATH")
+SLACK_OAUTH_STATE_PATH = os.getenv("SLACK_OAUTH_STATE_PATH")
+SLACK_TEAM_CLIENT_CACHE_SIZE = int(os.getenv("SLACK_TEAM_CLIENT_CACHE_SIZE", "100"))
+SLACK_TOKEN_ROTATION_MINUTES = int(os.getenv("SLACK_TOKEN_ROTATION_MINUTES", "120"))
+
+installation_store = make_installation_store(
+    SLACK_INSTALLATION_BACKEND, SLACK_INSTALLATION_PATH, client_id=SLACK_CLIENT_ID
+)
+oauth_state_store = make_state_store(SLACK_INSTALLATION_BACKEND, SLACK_OAUTH_STATE_PATH)
+authorize_url_generator = AuthorizeUrlGenerator(
+    client_id=SLACK_CLIENT_ID,
+    redirect_uri=SLACK_REDIRECT_URI,
+    scopes=SLACK_SCOPES,
+    user_scopes=SLACK_USER_SCOPES,
+)
+
+# Tokenless client for oauth.v2.access (installs and token rotation)
+oauth_client = PooledWebClient(base_url=SLACK_API_URL, pool=web_client.pool, timings=web_client.timings)
+
+
+def make_team_web_client(token):
+    # Every team shares the default client's keep-alive pool
+    return PooledWebClient(
+        token=token,
+        base_url=SLACK_API_URL,
+        pool=web_client.pool,
+        timings=web_client.timings,
+        retry_handlers=[ConnectionErrorRetryHandler(max_retry_count=SLACK_HTTP_MAX_RETRIES)],
+    )
+
+
+team_clients = TeamClients(
+    installation_store,
+    make_team_web_client,
+    wrap=lambda team_web_client: make_scheduler(team_web_client, senders=1),
+    max_size=SLACK_TEAM_CLIENT_CACHE_SIZE,
+    rotator=TokenRotator(
+        client_id=SLACK_CLIENT_ID, client_secret=SLACK_CLIENT_SECRET, client=oauth_client
+    ) if SLACK_CLIENT_ID and SLACK_CLIENT_SECRET else None,
+    rotate_minutes=SLACK_TOKEN_ROTATION_MINUTES,
+)
+
+
+@contextmanager
+def client_for(data):
+    """Client for the workspace an event came from, kept open while in use.
+
+    Falls back to the SLACK_BOT_TOKEN client for workspaces that never went
+    through the OAuth install.
+    """
+    with team_clients.lease(*installation_key(data)) as client:
+        yield client or slack_client
+
+
+# Ack-first mode: the route only queues the event, a worker pool runs the handlers
+SLACK_ACK_FIRST = os.getenv("SLACK_ACK_FIRST", "true").lower() in ("1", "true", "yes")
+SLACK_EVENT_WORKERS = int(os.getenv("SLACK_EVENT_WORKERS", "4"))
+SLACK_EVENT_QUEUE_SIZE = int(os.getenv("SLACK_EVENT_QUEUE_SIZE", "1000"))
+SLACK_EVENT_QUEUE_FULL = os.getenv("SLACK_EVENT_QUEUE_FULL", QUEUE_FULL_DROP)
+
+# User profile cache in front of users.info
+SLACK_USER_CACHE_SIZE = int(os.getenv("SLACK_USER_CACHE_SIZE", "5000"))
+SLACK_USER_CACHE_TTL = float(os.getenv("SLACK_USER_CACHE_TTL", "3600"))
+SLACK_USER_CACHE_WARM = os.getenv("SLACK_USER_CACHE_WARM", "false").lower() in ("1", "true", "yes")
+
+user_cache = UserCache(slack_client, max_size=SLACK_USER_CACHE_SIZE, ttl=SLACK_USER_CACHE_TTL)
+if SLACK_USER_CACHE_WARM:
+    user_cache.warm_in_background()
+
+# Dedup of redelivered events by event_id ("memory" or "sqlite" to share across processes)
+SLACK_DEDUP_BACKEND = os.getenv("SLACK_DEDUP_BACKEND", "memory")
+SLACK_DEDUP_PATH = os.getenv("SLACK_DEDUP_PATH", "slack_events.db")
+SLACK_DEDUP_WINDOW = float(os.getenv("SLACK_DEDUP_WINDOW", "3600"))
+SLACK_DEDUP_MAX_ENTRIES = int(os.getenv("SLACK_DEDUP_MAX_ENTRIES", "100000"))
+
+event_deduplicator = EventDeduplicator(make_event_index(
+    SLACK_DEDUP_BACKEND,
+    path=SLACK_DEDUP_PATH,
+    window=SLACK_DEDUP_WINDOW,
+    max_entries=SLACK_DEDUP_MAX_ENTRIES,
+))
+
 if any(var is None for var in [SLACK_CLIENT_ID, SLACK_CLIENT_SECRET, SLACK_BOT_TOKEN, SLACK_SIGNING_SECRET]):
     print("Error: Environment variables not set correctly.")
 
+
+# Per-stage timings of the events route; Web API call timings live in outbound.py
+EVENT_STAGE_SECONDS = Histogram(
+    "slack_event_stage_seconds",
+    "Time spent in each stage of handling a Slack event",
+    ["stage"],
+)
+_VERIFY_TIMER = EVENT_STAGE_SECONDS.labels("verify")
+_DEDUP_TIMER = EVENT_STAGE_SECONDS.labels("dedup")
+_PARSE_TIMER = EVENT_STAGE_SECONDS.labels("parse")
+_ROUTE_TIMER = EVENT_STAGE_SECONDS.labels("route")
+_HANDLE_TIMER = EVENT_STAGE_SECONDS.labels("handle")
+_ACK_TIMER = EVENT_STAGE_SECONDS.labels("ack")
+
+event_router = EventRouter()
+
+
+# Keep cached profiles fresh when users edit them or join the workspace
+@event_router.route("user_change")
+@event_router.route("team_join")
+def refresh_user(event, match, client):
+    user_cache.handle_event(event)
+
+
+# Respond to "hello" in any channel or DM
+@event_router.route("message", text="hello")
+def say_hello(event, match, client):
+    user_id = event.get("user")
+    channel_id = event.get("channel")
+
+    user_name = user_cache.get(user_id, client=client)["real_name"]
+    logfmt.info(log, "hello", user_id=user_id, user_name=user_name, channel_id=channel_id)
+
+    # Queued per channel; the scheduler paces and coalesces the actual sends
+    client.post_message(
+        channel=channel_id,
+        text=f"Hello, {user_name}! Nice one, I work as expected."
+    )
+
+
+def handle_event(data):
+    """Run the handler routed for one event_callback payload.
+
+    Returns True if the event was handled, False if nothing matched.
+    Raises SlackApiError if a Web API call fails.
+    """
+    with _HANDLE_TIMER.time(), client_for(data) as client:
+        return event_router.dispatch(data, client)
+
+
+event_dispatcher = EventDispatcher(
+    handle_event,
+    workers=SLACK_EVENT_WORKERS,
+    max_queue=SLACK_EVENT_QUEUE_SIZE,
+    on_full=SLACK_EVENT_QUEUE_FULL,
+)
+if SLACK_ACK_FIRST:
+    event_dispatcher.start()
+
+
+def shutdown():
+    """Drain queued events first, then the outbound queues their replies went to.
+
+    One hook in a fixed order: per-object atexit hooks run in reverse
+    registration order, and team schedulers are created after the dispatcher.
+    """
+    event_dispatcher.shutdown()
+    team_clients.shutdown()
+    slack_client.shutdown()
+
+
+atexit.register(shutdown)
+# atexit alone misses SIGTERM from process managers
+shutdown_on_signals(shutdown)
+
 # Create a new Flask web server
 app = Flask(__name__)
 
 # The route for the Slack events
 @app.route('/api/slack/events', methods=['POST'])
+@_ACK_TIMER.time()
 def slack_events():
     
         # --- Signature Verification ---
-    request_body = request.get_data()
-    slack_signature = request.headers['X-Slack-Signature']
-    timestamp = request.headers['X-Slack-Request-Timestamp']
+    with _VERIFY_TIMER.time():
+        request_body = request.get_data()
+        slack_signature = request.headers['X-Slack-Signature']
+        timestamp = request.headers['X-Slack-Request-Timestamp']
 
-    # Correct way to call is_valid_request:
-    # if not signature_verifier.is_valid_request(request_body, slack_signature, timestamp):
-    #     return jsonify({'status': 'invalid_request'}), 403
-    
+        # Correct way to call is_valid_request:
+        # if not signature_verifier.is_valid_request(request_body, slack_signature, timestamp):
+        #     return jsonify({'status': 'invalid_request'}), 403
+
+    # --- Duplicate Handling ---
+    # Slack redelivers late-acked events; answer 200 so it stops retrying
+    with _DEDUP_TIMER.time():
+        duplicate = event_deduplicator.is_duplicate(request_body, request.headers)
+    if duplicate:
+        return jsonify({'status': 'duplicate'}), 200
+
+    # Any error answer asks Slack to redeliver, so the event_id must not stick
+    try:
+        response = _process_event()
+    except Exception:
+        event_deduplicator.forget(request_body)
+        raise
+    if response[1] >= 300:
+        event_deduplicator.forget(request_body)
+    return response
+
+
+def _process_event():
      # --- Challenge Handling ---
     if request.content_type == 'application/json':
-        data = request.get_json()
+        with _PARSE_TIMER.time():
+            data = request.get_json()
 
         if data.get("type") == "url_verification":
             challenge_response = {"challenge": data.get("challenge")}
@@ -47,36 +290,94 @@ def slack_events():
 
          # --- Event Handling ---
         if data.get("type") == "event_callback":
-            event_type = data.get("event", {}).get("type")
-            user_id = data.get("event", {}).get("user")
-            text = data.get("event", {}).get("text", "").lower()
-            channel_id = data.get("event", {}).get("channel")
-
-        # Respond to "hello" in any channel or DM
-            if event_type == "message" and text == "hello":
-                try:
-                    # Log user_id before fetching user info
-                    logging.info(f"User ID: {user_id}") 
-
-                    user_info = web_client.users_info(user=user_id)
-                    user_name = user_info["user"]["real_name"]
-
-                    # Log user_name and channel_id before sending the message
-                    logging.info(f"User Name: {user_name}")
-                    logging.info(f"Channel ID: {channel_id}")
-
-                    web_client.chat_postMessage(
-                        channel=channel_id,
-                        text=f"Hello, {user_name}! Nice one, I work as expected."
-                    )
+            # Bot/self messages and events nothing is routed for never reach a worker
+            with _ROUTE_TIMER.time():
+                accepted = event_router.accepts(data)
+            if not accepted:
+                return jsonify({'status': 'ignored'}), 200
+
+            if SLACK_ACK_FIRST:
+                # Ack right away, the worker pool does the slow Web API calls
+                if event_dispatcher.submit(data):
+                    return jsonify({'status': 'ok'}), 200
+                return jsonify({'status': 'busy'}), 503
+
+            try:
+                if handle_event(data):
                     return jsonify({'status': 'ok'}), 200
 
-                except SlackApiError as e:
-                    logging.error(f"Error responding to message: {e}")
-                    return jsonify({"status": "error", "message": str(e)}), 500
+            except SlackApiError as e:
+                logfmt.error(log, "respond_failed", error=str(e))
+                return jsonify({"status": "error", "message": str(e)}), 500
 
     return jsonify({'status': 'event_not_processed'}), 400  
 
 
+# --- OAuth Install Flow ---
+@app.route('/api/slack/install', methods=['GET'])
+def slack_install():
+    state = oauth_state_store.issue()
+    return redirect(authorize_url_generator.generate(state))
+
+
+@app.route('/api/slack/oauth_redirect', methods=['GET'])
+def slack_oauth_redirect():
+    code = request.args.get("code")
+    state = request.args.get("state")
+    if "error" in request.args or not code:
+        return jsonify({'status': 'install_cancelled', 'error': request.args.get("error")}), 400
+    if not state or not oauth_state_store.consume(state):
+        return jsonify({'status': 'invalid_state'}), 400
+
+    try:
+        oauth_response = oauth_client.oauth_v2_access(
+            client_id=SLACK_CLIENT_ID,
+            client_secret=SLACK_CLIENT_SECRET,
+            code=code,
+            redirect_uri=SLACK_REDIRECT_URI,
+        )
+        installation = installation_from_oauth(oauth_client, oauth_response)
+    except SlackApiError as e:
+        logfmt.error(log, "install_failed", error=str(e))
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+    installation_store.save(installation)
+    # Drop any client built from a previous install so the new token is used
+    team_clients.invalidate(
+        installation.enterprise_id, installation.team_id, installation.is_enterprise_install
+    )
+    logfmt.info(log, "installed", team_id=installation.team_id,
+                enterprise_id=installation.enterprise_id)
+    return jsonify({'status': 'installed', 'team_id': installation.team_id}), 200
+
+
+# Queue depth and worker stats for the ack-first dispatcher, plus user cache counters
+@app.route('/api/slack/events/stats', methods=['GET'])
+def slack_event_stats():
+    return jsonify({
+        "queue": event_dispatcher.stats(),
+        "user_cache": user_cache.stats(),
+        "dedup": event_deduplicator.stats(),
+        "outbound": slack_client.stats(),
+        "transport": web_client.timings.stats(),
+        "team_clients": team_clients.stats(),
+    }), 200
+
+
+# The stats above as gauges, next to the stage and Web API histograms
+StatsGauges("slack_event_queue", event_dispatcher.stats)
+StatsGauges("slack_user_cache", user_cache.stats)
+StatsGauges("slack_dedup", event_deduplicator.stats)
+StatsGauges("slack_outbound", slack_client.stats)
+StatsGauges("slack_transport", web_client.timings.stats, label="method")
+StatsGauges("slack_team_clients", team_clients.stats)
+
+
+# Prometheus scrape endpoint
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
-    app.run(port=3000)
\ No newline at end of file
+    app.run(port=int(os.getenv("PORT", "3000")))
\ No newline at end of file
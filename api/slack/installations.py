@@ -0,0 +1,297 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from slack_sdk.oauth.installation_store import FileInstallationStore, Installation
+from slack_sdk.oauth.installation_store.sqlite3 import SQLite3InstallationStore
+from slack_sdk.oauth.state_store import FileOAuthStateStore
+from slack_sdk.oauth.state_store.sqlite3 import SQLite3OAuthStateStore
+
+log = logging.getLogger(__name__)
+
+
+def make_installation_store(backend="file", path=None, client_id=None):
+    if backend == "file":
+        return FileInstallationStore(base_dir=path or "./data/installations", client_id=client_id)
+    if backend == "sqlite":
+        return SQLite3InstallationStore(database=path or "installations.db", client_id=client_id)
+    raise ValueError(f"Unknown installation store backend: {backend!r}")
+
+
+def make_state_store(backend="file", path=None, expiration_seconds=600):
+    if backend == "file":
+        return FileOAuthStateStore(expiration_seconds=expiration_seconds,
+                                   base_dir=path or "./data/oauth-state")
+    if backend == "sqlite":
+        return SQLite3OAuthStateStore(database=path or "installations.db",
+                                      expiration_seconds=expiration_seconds)
+    raise ValueError(f"Unknown OAuth state store backend: {backend!r}")
+
+
+def installation_from_oauth(client, oauth_response):
+    """Build an Installation from an oauth.v2.access response."""
+    installed_enterprise = oauth_response.get("enterprise") or {}
+    installed_team = oauth_response.get("team") or {}
+    installer = oauth_response.get("authed_user") or {}
+    incoming_webhook = oauth_response.get("incoming_webhook") or {}
+    is_enterprise_install = oauth_response.get("is_enterprise_install") or False
+
+    bot_token = oauth_response.get("access_token")
+    bot_id = None
+    enterprise_url = None
+    if bot_token is not None:
+        auth_test = client.auth_test(token=bot_token)
+        bot_id = auth_test["bot_id"]
+        if is_enterprise_install:
+            enterprise_url = auth_test.get("url")
+
+    return Installation(
+        app_id=oauth_response.get("app_id"),
+        enterprise_id=installed_enterprise.get("id"),
+        enterprise_name=installed_enterprise.get("name"),
+        enterprise_url=enterprise_url,
+        team_id=installed_team.get("id"),
+        team_name=installed_team.get("name"),
+        bot_token=bot_token,
+        bot_id=bot_id,
+        bot_user_id=oauth_response.get("bot_user_id"),
+        bot_scopes=oauth_response.get("scope"),
+        bot_refresh_token=oauth_response.get("refresh_token"),
+        bot_token_expires_in=oauth_response.get("expires_in"),
+        user_id=installer.get("id"),
+        user_token=installer.get("access_token"),
+        user_scopes=installer.get("scope"),
+        user_refresh_token=installer.get("refresh_token"),
+        user_token_expires_in=installer.get("expires_in"),
+        incoming_webhook_url=incoming_webhook.get("url"),
+        incoming_webhook_channel=incoming_webhook.get("channel"),
+        incoming_webhook_channel_id=incoming_webhook.get("channel_id"),
+        incoming_webhook_configuration_url=incoming_webhook.get("configuration_url"),
+        is_enterprise_install=is_enterprise_install,
+        token_type=oauth_response.get("token_type"),
+    )
+
+
+def installation_key(data):
+    """(enterprise_id, team_id, is_enterprise_install) for an event payload."""
+    authorizations = data.get("authorizations") or [{}]
+    is_enterprise_install = bool(authorizations[0].get("is_enterprise_install"))
+    return data.get("enterprise_id"), data.get("team_id"), is_enterprise_install
+
+
+class _TeamEntry:
+    __slots__ = ("bot", "web_client", "client", "rotating", "leases", "retired")
+
+    def __init__(self, bot, web_client, client):
+        self.bot = bot
+        self.web_client = web_client
+        self.client = client
+        self.rotating = threading.Lock()
+        # Handlers currently using the client; a retired entry closes when the last one is done
+        self.leases = 0
+        self.retired = False
+
+
+class TeamClients:
+    """LRU of ready-built Slack clients, one per installed workspace or org.
+
+    A hit is a dict lookup; the installation store is only read on a miss.
+    Teams without an installation are remembered for missing_ttl seconds so
+    they don't turn into a store read per event either.
+
+    make_web_client(token) builds the WebClient; wrap(web_client) optionally
+    wraps it (e.g. in an OutboundScheduler) and is what get() returns. Bot
+    tokens close to expiry are rotated in place: the new token is set on the
+    existing WebClient, so calls already in flight finish on the old token,
+    which stays valid until it expires.
+
+    Handlers should hold the client through lease(): a client evicted from
+    the LRU or replaced by a reinstall is only closed once every lease on it
+    is released, so replies already being sent through it are not lost.
+    """
+
+    def __init__(self, store, make_web_client, wrap=None, max_size=100, missing_ttl=60.0,
+                 rotator=None, rotate_minutes=120):
+        self.store = store
+        self.make_web_client = make_web_client
+        self.wrap = wrap or (lambda web_client: web_client)
+        self.max_size = max(1, int(max_size))
+        self.missing_ttl = missing_ttl
+        self.rotator = rotator
+        self.rotate_minutes = rotate_minutes
+        self._entries = OrderedDict()
+        self._missing = {}
+        # Dropped from the cache but still leased; closed on their last release
+        self._retired = set()
+        self._closing = []
+        self._lock = threading.Lock()
+
+    def get(self, enterprise_id, team_id, is_enterprise_install=False):
+        """Return the client for a team, or None if it never installed the app.
+
+        The client may be closed once it is evicted; use lease() to hold it.
+        """
+        entry = self._acquire(enterprise_id, team_id, is_enterprise_install, lease=False)
+        return entry.client if entry is not None else None
+
+    @contextmanager
+    def lease(self, enterprise_id, team_id, is_enterprise_install=False):
+        """get() that keeps the client open until the with block exits."""
+        entry = self._acquire(enterprise_id, team_id, is_enterprise_install, lease=True)
+        try:
+            yield entry.client if entry is not None else None
+        finally:
+            if entry is not None:
+                self._release(entry)
+
+    def _acquire(self, enterprise_id, team_id, is_enterprise_install, lease):
+        # Org-wide installs are shared by every workspace in the org
+        key = (enterprise_id, None if is_enterprise_install else team_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.leases += lease
+            elif self._missing.get(key, 0.0) > time.monotonic():
+                return None
+
+        if entry is None:
+            entry = self._load(key, enterprise_id, team_id, is_enterprise_install, lease)
+            if entry is None:
+                return None
+
+        if self.rotator is not None and self._expiring(entry.bot):
+            self._rotate(entry)
+        return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.leases -= 1
+            close = entry.retired and entry.leases == 0
+            if close:
+                self._retired.discard(entry)
+        if close:
+            self._close(entry)
+
+    def invalidate(self, enterprise_id, team_id, is_enterprise_install=False):
+        """Forget a team, e.g. after it reinstalls; the next get() reloads it."""
+        key = (enterprise_id, None if is_enterprise_install else team_id)
+        with self._lock:
+            self._missing.pop(key, None)
+            entry = self._entries.pop(key, None)
+            close = entry is not None and self._retire(entry)
+        if close:
+            self._close(entry)
+
+    def shutdown(self, timeout=10.0):
+        """Drain and close every client, e.g. when the process exits.
+
+        Run it after the handlers are done: leased clients are closed too.
+        """
+        with self._lock:
+            entries = list(self._entries.values()) + list(self._retired)
+            self._entries.clear()
+            self._retired.clear()
+            for entry in entries:
+                entry.retired = True
+        for entry in entries:
+            self._close(entry)
+        with self._lock:
+            threads, self._closing = self._closing, []
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached": len(self._entries),
+                "max_size": self.max_size,
+                "missing": len(self._missing),
+                "retired": len(self._retired),
+            }
+
+    def _load(self, key, enterprise_id, team_id, is_enterprise_install, lease=False):
+        bot = self.store.find_bot(
+            enterprise_id=enterprise_id,
+            team_id=team_id,
+            is_enterprise_install=is_enterprise_install,
+        )
+        if bot is None:
+            now = time.monotonic()
+            with self._lock:
+                if len(self._missing) >= self.max_size * 10:
+                    self._missing = {k: until for k, until in self._missing.items() if until > now}
+                self._missing[key] = now + self.missing_ttl
+            return None
+
+        web_client = self.make_web_client(bot.bot_token)
+        entry = _TeamEntry(bot, web_client, self.wrap(web_client))
+        evicted = []
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                # Another thread loaded it first; keep theirs
+                evicted.append(entry)
+                entry = existing
+            else:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_size:
+                    old = self._entries.popitem(last=False)[1]
+                    if self._retire(old):
+                        evicted.append(old)
+            entry.leases += lease
+        for old in evicted:
+            self._close(old)
+        return entry
+
+    def _retire(self, entry):
+        """Mark an entry dropped from the cache; True if nobody holds it and it can close now."""
+        entry.retired = True
+        if entry.leases:
+            self._retired.add(entry)
+            return False
+        return True
+
+    def _expiring(self, bot):
+        expires_at = bot.bot_token_expires_at
+        return (
+            expires_at is not None
+            and bot.bot_refresh_token is not None
+            and expires_at - time.time() < self.rotate_minutes * 60
+        )
+
+    def _rotate(self, entry):
+        # One thread rotates; the others keep using the still-valid current token
+        if not entry.rotating.acquire(blocking=False):
+            return
+        try:
+            if not self._expiring(entry.bot):
+                return
+            refreshed = self.rotator.perform_bot_token_rotation(
+                bot=entry.bot, minutes_before_expiration=self.rotate_minutes
+            )
+            if refreshed is None:
+                return
+            self.store.save_bot(refreshed)
+            entry.web_client.token = refreshed.bot_token
+            entry.bot = refreshed
+            log.info("Rotated bot token for team %s", refreshed.team_id)
+        except Exception:
+            log.exception("Bot token rotation failed for team %s", entry.bot.team_id)
+        finally:
+            entry.rotating.release()
+
+    def _close(self, entry):
+        shutdown = getattr(entry.client, "shutdown", None)
+        if shutdown is None:
+            return
+        # Drain anything still queued for the team without blocking the caller
+        thread = threading.Thread(target=shutdown, name="slack-team-client-close", daemon=True)
+        thread.start()
+        with self._lock:
+            # shutdown() waits for these, so queued replies aren't cut off at exit
+            self._closing = [t for t in self._closing if t.is_alive()]
+            self._closing.append(thread)
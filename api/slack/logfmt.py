@@ -0,0 +1,40 @@
+import logging
+
+
+class Fields:
+    """key=value rendering of structured log fields, done only if a handler formats it."""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return " ".join(f"{key}={value!r}" for key, value in self.fields.items())
+
+
+def log_event(logger, level, event, **fields):
+    """Log `event` with structured fields, e.g. log_event(log, INFO, "hello", user_id=u).
+
+    Returns at once when the level is filtered out; otherwise the fields are
+    attached as record.fields for structured handlers and rendered lazily
+    as key=value pairs for plain-text ones.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, "%s %s", event, Fields(fields), extra={"fields": fields})
+
+
+def debug(logger, event, **fields):
+    log_event(logger, logging.DEBUG, event, **fields)
+
+
+def info(logger, event, **fields):
+    log_event(logger, logging.INFO, event, **fields)
+
+
+def warning(logger, event, **fields):
+    log_event(logger, logging.WARNING, event, **fields)
+
+
+def error(logger, event, **fields):
+    log_event(logger, logging.ERROR, event, **fields)
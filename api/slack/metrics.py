@@ -0,0 +1,186 @@
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans a cache hit through a slow Web API call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_:]")
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_buckets", "_counts", "_sum", "_count")
+
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self._counts = [0] * len(buckets)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value):
+        # Only the matching bucket is bumped; render() turns them cumulative
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            if index < len(self._counts):
+                self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+
+class Histogram:
+    """Fixed-bucket histogram, optionally split by label values.
+
+    Observing is a bisect plus one locked increment, cheap enough to wrap
+    every stage of every request.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS,
+                 registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = _HistogramChild(self.buckets)
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, _HistogramChild(self.buckets))
+        return child
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, child in sorted(self._children.items()):
+            counts, total, count = child.snapshot()
+            labels = list(zip(self.labelnames, values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(labels + [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(labels + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+
+class StatsGauges:
+    """Exports a stats() dict as gauges, e.g. queue depth or cache hits.
+
+    Numeric values become `<prefix>_<key>`; a dict of numbers becomes one
+    gauge labelled by `key`, and a dict of dicts one gauge per inner field
+    labelled by `key`. When every value of stats() is a dict (per-method
+    timings), the keys are label values instead: `<prefix>_<field>{<label>=key}`.
+    Names are sanitized to what Prometheus accepts.
+    """
+
+    def __init__(self, prefix, stats, label="key", registry=None):
+        self.prefix = prefix
+        self.stats = stats
+        self.label = label
+        (registry or REGISTRY).register(self)
+
+    def render(self):
+        series = {}
+
+        def add(name, labels, value):
+            series.setdefault(_metric_name(name), []).append((labels, value))
+
+        stats = self.stats()
+        if stats and all(isinstance(value, dict) for value in stats.values()):
+            for label_value, fields in stats.items():
+                for field, value in fields.items():
+                    if _is_number(value):
+                        add(f"{self.prefix}_{field}", [(self.label, label_value)], value)
+        else:
+            for key, value in stats.items():
+                if _is_number(value):
+                    add(f"{self.prefix}_{key}", [], value)
+                elif isinstance(value, dict):
+                    for sub_key, sub_value in value.items():
+                        if _is_number(sub_value):
+                            add(f"{self.prefix}_{key}", [("key", sub_key)], sub_value)
+                        elif isinstance(sub_value, dict):
+                            for field, field_value in sub_value.items():
+                                if _is_number(field_value):
+                                    add(f"{self.prefix}_{key}_{field}", [("key", sub_key)],
+                                        field_value)
+
+        lines = []
+        for name, samples in series.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """Everything registered, in the Prometheus text exposition format."""
+        with self._lock:
+            collectors = list(self._collectors)
+        lines = []
+        for collector in collectors:
+            lines.extend(collector.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _metric_name(name):
+    name = _INVALID_NAME_CHARS.sub("_", name)
+    return f"_{name}" if name[:1].isdigit() else name
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
@@ -0,0 +1,299 @@
+import functools
+import logging
+import threading
+import time
+from collections import deque
+
+from slack_sdk.errors import SlackApiError
+
+from metrics import Histogram
+
+# Requests per minute for each Web API rate limit tier
+TIER_RATES = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# Tier of the methods this app calls; anything else is treated as Tier 3
+METHOD_TIERS = {
+    "users_info": 4,
+    "users_list": 2,
+    "oauth_v2_access": 4,
+}
+
+# chat.postMessage is "special": about 1 message per second per channel, with a
+# workspace-wide allowance well above the tiered methods
+CHAT_POST_MESSAGE_RATE = 300
+CHANNEL_INTERVAL = 1.0
+
+API_CALL_SECONDS = Histogram(
+    "slack_api_call_seconds",
+    "Duration of Slack Web API calls, excluding time spent waiting on rate limits",
+    ["method"],
+)
+API_THROTTLE_SECONDS = Histogram(
+    "slack_api_throttle_seconds",
+    "Time Slack Web API calls waited on the rate limiter",
+    ["method"],
+)
+
+# Coalesced messages are joined until they would pass this many characters
+MAX_COALESCED_CHARS = 3000
+
+# Slack counts each tier per minute, so a full minute's budget may go out at once
+DEFAULT_BURST_SECONDS = 60.0
+
+
+def parse_tier_rates(text):
+    """Parse "1=1,2=20,3=50,4=100" (requests per minute by tier) over TIER_RATES."""
+    rates = dict(TIER_RATES)
+    for part in (text or "").split(","):
+        if part.strip():
+            tier, _, per_minute = part.partition("=")
+            rates[int(tier)] = float(per_minute)
+    return rates
+
+
+class TokenBucket:
+    """Token bucket that hands out wait times instead of refusing callers.
+
+    Callers take a token even if the bucket is empty and sleep for the
+    returned delay, so bursts are spread out at the bucket's rate.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            if now > self._updated:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+            self._tokens -= 1
+            return (self._updated - now) + max(0.0, -self._tokens) / self.rate
+
+    def block(self, seconds):
+        """Hold back every token for the next `seconds`, e.g. after a 429."""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, time.monotonic() + seconds)
+
+
+class OutboundScheduler:
+    """Rate-limit-aware wrapper around a WebClient.
+
+    Any WebClient method can be called on the scheduler (users_info, users_list,
+    ...). Calls wait for a token from their tier's bucket and retry 429s after
+    Retry-After instead of raising. post_message() queues chat.postMessage
+    per channel, honours the 1 message per second per channel limit, and
+    joins plain-text messages that pile up for the same channel.
+
+    tier_rates (requests per minute by tier) and chat_rate override Slack's
+    published limits. Each bucket holds burst_seconds worth of its rate, so
+    a burst of new users doesn't park the calling threads while the minute's
+    budget is still unspent.
+
+    Call shutdown() on exit to send what is still queued; the app does that
+    after draining the event queue that feeds it.
+    """
+
+    def __init__(self, client, max_retries=3, senders=2, coalesce=True, tier_rates=None,
+                 chat_rate=CHAT_POST_MESSAGE_RATE, burst_seconds=DEFAULT_BURST_SECONDS):
+        self.client = client
+        self.max_retries = max_retries
+        self.coalesce = coalesce
+        self.tier_rates = dict(tier_rates or TIER_RATES)
+        self.chat_rate = chat_rate
+        self.burst_seconds = burst_seconds
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._channel_ready = {}
+        self._in_flight = set()
+        self._closed = False
+        self._senders = [
+            threading.Thread(target=self._send_loop, name=f"slack-outbound-{i}", daemon=True)
+            for i in range(max(1, int(senders)))
+        ]
+
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "rate_limited": 0,
+            "retries": 0,
+            "queued": 0,
+            "sent": 0,
+            "coalesced": 0,
+            "failed": 0,
+        }
+        self._throttle_wait = 0.0
+        self._queue_wait = 0.0
+        self._queue_samples = 0
+        self._max_queue_wait = 0.0
+
+        for thread in self._senders:
+            thread.start()
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+        return functools.partial(self.call, name)
+
+    def call(self, method, **kwargs):
+        """Call a WebClient method once its bucket allows, retrying on 429."""
+        bucket = self._bucket_for(method)
+        call_timer = API_CALL_SECONDS.labels(method)
+        throttle_timer = API_THROTTLE_SECONDS.labels(method)
+        for attempt in range(self.max_retries + 1):
+            wait = bucket.reserve()
+            if wait > 0:
+                time.sleep(wait)
+            throttle_timer.observe(max(0.0, wait))
+            self._record(calls=1, throttle_wait=wait)
+            try:
+                with call_timer.time():
+                    return getattr(self.client, method)(**kwargs)
+            except SlackApiError as e:
+                if e.response.status_code != 429 or attempt == self.max_retries:
+                    raise
+                retry_after = float(e.response.headers.get("Retry-After", 1))
+                logging.warning("Rate limited on %s, retrying in %.1fs", method, retry_after)
+                bucket.block(retry_after)
+                self._record(rate_limited=1, retries=1)
+
+    def post_message(self, channel, text, **kwargs):
+        """Queue a chat.postMessage for the channel and return immediately."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Outbound scheduler is shut down")
+            self._pending.setdefault(channel, deque()).append((time.monotonic(), text, kwargs))
+            self._cond.notify()
+        self._record(queued=1)
+
+    def shutdown(self, timeout=10.0):
+        """Send whatever is still queued, then stop the sender threads."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._senders:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._cond:
+            depth = sum(len(items) for items in self._pending.values())
+            channels = len(self._pending)
+        with self._stats_lock:
+            stats = dict(self._counters)
+            calls = stats["calls"]
+            samples = self._queue_samples
+            stats.update(
+                depth=depth,
+                channels=channels,
+                avg_throttle_wait_ms=(self._throttle_wait / calls * 1000) if calls else 0.0,
+                avg_queue_wait_ms=(self._queue_wait / samples * 1000) if samples else 0.0,
+                max_queue_wait_ms=self._max_queue_wait * 1000,
+            )
+        return stats
+
+    def _bucket_for(self, method):
+        with self._buckets_lock:
+            bucket = self._buckets.get(method)
+            if bucket is None:
+                if method == "chat_postMessage":
+                    per_minute = self.chat_rate
+                else:
+                    per_minute = self.tier_rates[METHOD_TIERS.get(method, 3)]
+                bucket = TokenBucket(per_minute / 60.0,
+                                     max(1, int(per_minute * self.burst_seconds / 60.0)))
+                self._buckets[method] = bucket
+            return bucket
+
+    def _record(self, calls=0, rate_limited=0, retries=0, queued=0, throttle_wait=0.0):
+        with self._stats_lock:
+            self._counters["calls"] += calls
+            self._counters["rate_limited"] += rate_limited
+            self._counters["retries"] += retries
+            self._counters["queued"] += queued
+            self._throttle_wait += max(0.0, throttle_wait)
+
+    def _next_channel(self, now):
+        """Return (channel, delay) for the channel that can send soonest."""
+        best, best_ready = None, None
+        for channel in self._pending:
+            if channel in self._in_flight:
+                continue
+            ready = self._channel_ready.get(channel, 0.0)
+            if best is None or ready < best_ready:
+                best, best_ready = channel, ready
+        if best is None:
+            return None, None
+        return best, best_ready - now
+
+    def _take_batch(self, channel):
+        items = self._pending[channel]
+        batch = [items.popleft()]
+        if self.coalesce and not batch[0][2]:
+            size = len(batch[0][1])
+            while items and not items[0][2] and size + len(items[0][1]) + 1 <= MAX_COALESCED_CHARS:
+                size += len(items[0][1]) + 1
+                batch.append(items.popleft())
+        if not items:
+            del self._pending[channel]
+        return batch
+
+    def _send_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    channel, delay = self._next_channel(now)
+                    if channel is not None and delay <= 0:
+                        break
+                    if channel is None and self._closed and not self._in_flight:
+                        self._cond.notify_all()
+                        return
+                    self._cond.wait(delay)
+                batch = self._take_batch(channel)
+                self._in_flight.add(channel)
+
+            try:
+                self._send_batch(channel, batch)
+            finally:
+                with self._cond:
+                    self._in_flight.discard(channel)
+                    now = time.monotonic()
+                    self._channel_ready[channel] = now + CHANNEL_INTERVAL
+                    # Forget channels that have nothing queued and whose interval has passed
+                    for idle in [c for c, ready in self._channel_ready.items()
+                                 if ready < now and c not in self._pending]:
+                        del self._channel_ready[idle]
+                    self._cond.notify_all()
+
+    def _send_batch(self, channel, batch):
+        started = time.monotonic()
+        _, _, kwargs = batch[0]
+        text = "\n".join(item[1] for item in batch)
+        try:
+            self.call("chat_postMessage", channel=channel, text=text, **kwargs)
+            outcome = "sent"
+        except Exception as e:
+            # Includes URLError once the connection retries run out; the sender must survive it
+            logging.error("Error posting message to %s: %s", channel, e)
+            outcome = "failed"
+        with self._stats_lock:
+            self._counters[outcome] += 1
+            self._counters["coalesced"] += len(batch) - 1
+            self._queue_samples += len(batch)
+            for enqueued_at, _, _ in batch:
+                waited = started - enqueued_at
+                self._queue_wait += waited
+                self._max_queue_wait = max(self._max_queue_wait, waited)
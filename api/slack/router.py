@@ -0,0 +1,136 @@
+import re
+
+
+class Route:
+    """A handler plus the matchers compiled for it at registration time."""
+
+    __slots__ = ("handler", "text", "pattern", "channels")
+
+    def __init__(self, handler, text=None, pattern=None, channels=None):
+        self.handler = handler
+        self.text = text.lower() if text is not None else None
+        self.pattern = re.compile(pattern, re.IGNORECASE) if isinstance(pattern, str) else pattern
+        self.channels = frozenset(channels) if channels is not None else None
+
+    def match(self, event):
+        """Return (True, re.Match or None) if the event matches, else (False, None)."""
+        if self.channels is not None and event.get("channel") not in self.channels:
+            return False, None
+        if self.pattern is not None:
+            found = self.pattern.search(event.get("text") or "")
+            return found is not None, found
+        return True, None
+
+
+class _Bucket:
+    """Routes for one (type, event.type, subtype) key.
+
+    Exact-text routes sit in a dict so a message is looked up by its text
+    instead of being compared against every command; the rest are tried
+    in registration order afterwards.
+    """
+
+    __slots__ = ("exact", "others")
+
+    def __init__(self):
+        self.exact = {}
+        self.others = []
+
+
+class EventRouter:
+    """Dispatches Slack payloads on (type, event.type, subtype) in O(1).
+
+    Register handlers with the route() decorator. accepts() is the cheap
+    pre-filter: it drops bot and self messages, anything nothing is routed
+    for and messages whose text no exact-text route matches, so the events
+    endpoint can ack those without queueing them.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+
+    def route(self, event_type, subtype=None, text=None, pattern=None, channels=None,
+              payload_type="event_callback"):
+        """Decorator registering a handler for matching events.
+
+        dispatch() calls it as handler(event, match, *args), with whatever
+        extra args it was given (events.py passes the team's client).
+        text is an exact, case-insensitive match on the message text,
+        pattern a regex searched in it (its match object is passed as
+        `match`), and channels an allow-list of channel ids.
+        """
+        def decorator(handler):
+            self.add(handler, event_type, subtype=subtype, text=text, pattern=pattern,
+                     channels=channels, payload_type=payload_type)
+            return handler
+        return decorator
+
+    def add(self, handler, event_type, subtype=None, text=None, pattern=None, channels=None,
+            payload_type="event_callback"):
+        key = (payload_type, event_type, subtype)
+        bucket = self._buckets.setdefault(key, _Bucket())
+        route = Route(handler, text=text, pattern=pattern, channels=channels)
+        if route.text is not None:
+            bucket.exact.setdefault(route.text, []).append(route)
+        else:
+            bucket.others.append(route)
+        return route
+
+    def accepts(self, data):
+        """Pre-filter: False for payloads no handler should ever see."""
+        event = data.get("event") or {}
+        if event.get("bot_id") or event.get("subtype") == "bot_message":
+            return False
+
+        user = event.get("user")
+        if isinstance(user, str):
+            # authorizations lists the installing bot user, i.e. ourselves
+            for authorization in data.get("authorizations") or ():
+                if authorization.get("user_id") == user:
+                    return False
+
+        bucket = self._buckets.get(self._key(data, event))
+        if bucket is None:
+            return False
+        if bucket.others:
+            return True
+        # Only exact-text routes: ordinary chatter can be dropped here too
+        text = event.get("text")
+        return bool(text) and text.lower() in bucket.exact
+
+    def resolve(self, data):
+        """Return (handler, match) for the first matching route, or None."""
+        event = data.get("event") or {}
+        bucket = self._buckets.get(self._key(data, event))
+        if bucket is None:
+            return None
+
+        if bucket.exact:
+            text = event.get("text")
+            if text:
+                for route in bucket.exact.get(text.lower(), ()):
+                    matched, found = route.match(event)
+                    if matched:
+                        return route.handler, found
+
+        for route in bucket.others:
+            matched, found = route.match(event)
+            if matched:
+                return route.handler, found
+        return None
+
+    def dispatch(self, data, *args):
+        """Run the first matching handler. Returns True if one ran.
+
+        Extra args are passed to the handler after (event, match).
+        """
+        resolved = self.resolve(data)
+        if resolved is None:
+            return False
+        handler, found = resolved
+        handler(data.get("event") or {}, found, *args)
+        return True
+
+    @staticmethod
+    def _key(data, event):
+        return data.get("type"), event.get("type"), event.get("subtype")
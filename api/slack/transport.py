@@ -0,0 +1,237 @@
+import http.client
+import io
+import threading
+import time
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+
+import urllib3
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackRequestError
+
+# Timing of the request currently being sent on this thread
+_current = threading.local()
+
+PHASES = ("connect", "tls", "ttfb", "total")
+
+
+def api_method_name(url):
+    """users_info for .../api/users.info: the WebClient method name, as the outbound metrics use."""
+    return urlsplit(url).path.rsplit("/", 1)[-1].replace(".", "_")
+
+
+def _record(phase, seconds):
+    timing = getattr(_current, "timing", None)
+    if timing is not None:
+        timing[phase] += seconds
+
+
+class _TimedConnectionMixin:
+    """Times the TCP connect, TLS handshake and time to first byte."""
+
+    def _new_conn(self):
+        started = time.perf_counter()
+        sock = super()._new_conn()
+        _record("connect", time.perf_counter() - started)
+        return sock
+
+    def connect(self):
+        timing = getattr(_current, "timing", None)
+        if timing is not None:
+            timing["reused"] = False
+        started = time.perf_counter()
+        tcp_before = timing["connect"] if timing is not None else 0.0
+        super().connect()
+        # For HTTPS whatever connect() spent beyond the TCP connect is the handshake
+        if timing is not None and isinstance(self, HTTPSConnection):
+            timing["tls"] += (time.perf_counter() - started) - (timing["connect"] - tcp_before)
+
+    def request(self, *args, **kwargs):
+        super().request(*args, **kwargs)
+        self._sent_at = time.perf_counter()
+
+    def getresponse(self):
+        response = super().getresponse()
+        _record("ttfb", time.perf_counter() - self._sent_at)
+        return response
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _IdleClearingMixin:
+    """Drops every pooled connection once the pool has sat unused for a while.
+
+    Tracked on the pool rather than per client, so a rarely used client that
+    shares it (OAuth, a quiet workspace) can't throw away connections that
+    busy clients keep warm.
+    """
+
+    def __init__(self, *args, idle_timeout=30.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.idle_timeout = idle_timeout
+        self._last_used = time.monotonic()
+        self._idle_lock = threading.Lock()
+
+    def touch(self):
+        now = time.monotonic()
+        with self._idle_lock:
+            idle = now - self._last_used > self.idle_timeout
+            self._last_used = now
+        if idle:
+            self.clear()
+
+
+class _PoolManager(_IdleClearingMixin, urllib3.PoolManager):
+    pass
+
+
+class _ProxyManager(_IdleClearingMixin, urllib3.ProxyManager):
+    pass
+
+
+class CallTimings:
+    """Running totals of per-phase timings, grouped by Web API method (users_info)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods = {}
+
+    def add(self, method, timing):
+        with self._lock:
+            totals = self._methods.get(method)
+            if totals is None:
+                totals = self._methods[method] = dict.fromkeys(PHASES, 0.0)
+                totals.update(calls=0, new_connections=0)
+            totals["calls"] += 1
+            if not timing["reused"]:
+                totals["new_connections"] += 1
+            for phase in PHASES:
+                totals[phase] += timing[phase]
+
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for method, totals in self._methods.items():
+                calls = totals["calls"]
+                stats[method] = {
+                    "calls": calls,
+                    "new_connections": totals["new_connections"],
+                    **{f"avg_{phase}_ms": totals[phase] / calls * 1000 for phase in PHASES},
+                }
+        return stats
+
+
+class PooledWebClient(WebClient):
+    """WebClient that sends every call over one shared urllib3 PoolManager.
+
+    The stock client opens a fresh connection (and TLS handshake) per call;
+    this one keeps up to pool_size keep-alive connections per host and is
+    safe to share between threads. Once the pool has gone unused for longer
+    than idle_timeout its connections are dropped before the next call
+    rather than risking a reset from the server side. retry_handlers work as
+    on WebClient: failures before the request was sent surface as URLError,
+    which ConnectionErrorRetryHandler retries; read timeouts surface as
+    TimeoutError, which it doesn't, so a slow post is never sent twice.
+    Error statuses surface as HTTPError.
+
+    Pass pool (and timings) from another PooledWebClient to share its
+    connections, e.g. between clients for different workspaces; the pool's
+    own idle_timeout then applies.
+    """
+
+    def __init__(self, *args, pool_size=10, idle_timeout=30.0, pool=None, timings=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = timings or CallTimings()
+        if pool is not None:
+            self.pool = pool
+            return
+
+        pool_kwargs = dict(
+            num_pools=4,
+            maxsize=pool_size,
+            retries=False,
+            timeout=urllib3.Timeout(total=self.timeout),
+            idle_timeout=idle_timeout,
+        )
+        if self.ssl is not None:
+            pool_kwargs["ssl_context"] = self.ssl
+        if self.proxy:
+            self.pool = _ProxyManager(self.proxy, **pool_kwargs)
+        else:
+            self.pool = _PoolManager(**pool_kwargs)
+        self.pool.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+    def _perform_urllib_http_request_internal(self, url, req):
+        if not url.lower().startswith("http"):
+            raise SlackRequestError(f"Invalid URL detected: {url}")
+
+        touch = getattr(self.pool, "touch", None)
+        if touch is not None:
+            touch()
+
+        timing = _current.timing = dict.fromkeys(PHASES, 0.0)
+        timing["reused"] = True
+        started = time.perf_counter()
+        try:
+            response = self.pool.request(
+                req.get_method(),
+                url,
+                body=req.data,
+                headers={key: str(value) for key, value in req.header_items()},
+            )
+        except (
+            urllib3.exceptions.NewConnectionError,
+            urllib3.exceptions.ConnectTimeoutError,
+            urllib3.exceptions.ProxyError,
+            urllib3.exceptions.SSLError,
+        ) as e:
+            # Nothing reached Slack yet; URLError is what ConnectionErrorRetryHandler retries on
+            raise URLError(e) from e
+        except urllib3.exceptions.ReadTimeoutError as e:
+            # Slack may already have acted on it (e.g. posted the message), so don't let it be
+            # resent; the stock client raises a bare TimeoutError here too
+            raise TimeoutError(str(e)) from e
+        except urllib3.exceptions.ProtocolError as e:
+            # A kept-alive connection the server had already closed fails before the request
+            # lands; on a fresh connection the request may have been processed
+            if timing["reused"]:
+                raise URLError(e) from e
+            raise ConnectionError(str(e)) from e
+        except urllib3.exceptions.HTTPError as e:
+            raise ConnectionError(str(e)) from e
+        finally:
+            timing["total"] = time.perf_counter() - started
+            _current.timing = None
+            self.timings.add(api_method_name(url), timing)
+
+        headers = http.client.HTTPMessage()
+        for key, value in response.headers.items():
+            headers[key] = value
+        if response.status >= 400:
+            raise HTTPError(url, response.status, response.reason, headers, io.BytesIO(response.data))
+
+        if headers.get_content_type() == "application/gzip":
+            # admin.analytics.getFile
+            return {"status": response.status, "headers": headers, "body": response.data}
+        charset = headers.get_content_charset() or "utf-8"
+        return {"status": response.status, "headers": headers, "body": response.data.decode(charset)}
+
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+def _next_cursor(page):
+    return (page.get("response_metadata") or {}).get("next_cursor")
+
+
+class UserCache:
+    """LRU + TTL cache of Slack user profiles in front of users.info.
+
+    Profiles are kept as the "user" object Slack returns, so callers read
+    fields such as real_name exactly as they would from users_info().
+    """
+
+    def __init__(self, web_client, max_size=5000, ttl=3600.0):
+        self.web_client = web_client
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, user_id, client=None):
+        """Return the cached profile for user_id, calling users.info on a miss.
+
+        client overrides the cache's own client for the lookup, e.g. the
+        one for the workspace the event came from.
+        """
+        profile = self._lookup(user_id)
+        if profile is None:
+            # Fetch outside the lock so one slow call doesn't stall every worker
+            profile = (client or self.web_client).users_info(user=user_id)["user"]
+            self.put(profile, user_id)
+        return profile
+
+    def _lookup(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                expires_at, profile = entry
+                if expires_at > now:
+                    self._entries.move_to_end(user_id)
+                    self._counters["hits"] += 1
+                    return profile
+                del self._entries[user_id]
+                self._counters["expirations"] += 1
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, profile, user_id=None):
+        user_id = user_id or profile.get("id")
+        if not user_id:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, profile)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self._counters["invalidations"] += 1
+
+    def handle_event(self, event):
+        """Refresh the cache from user_change / team_join events.
+
+        Both events carry the full user object, so it replaces the cached
+        entry directly instead of forcing another users.info call.
+        Returns True if the event was one of those types.
+        """
+        if event.get("type") not in ("user_change", "team_join"):
+            return False
+        profile = event.get("user")
+        if isinstance(profile, dict) and profile.get("id"):
+            self.invalidate(profile["id"])
+            self.put(profile)
+        return True
+
+    def warm(self, page_size=200):
+        """Page through users.list and fill the cache in bulk.
+
+        Each page is its own users_list() call, so a rate-limiting client
+        (OutboundScheduler) paces every page rather than just the first;
+        iterating the response would fetch the rest behind its back.
+        """
+        loaded = 0
+        cursor = None
+        while True:
+            page = self.web_client.users_list(limit=page_size, cursor=cursor)
+            loaded += self._load_page(page)
+            cursor = _next_cursor(page)
+            if not cursor:
+                break
+        logging.info("Warmed user cache with %d profiles", loaded)
+        return loaded
+
+    def _load_page(self, page):
+        loaded = 0
+        for profile in page.get("members", []):
+            if profile.get("deleted"):
+                continue
+            self.put(profile)
+            loaded += 1
+        return loaded
+
+    def warm_in_background(self, page_size=200):
+        def run():
+            try:
+                self.warm(page_size)
+            except Exception:
+                logging.exception("User cache warm-up failed")
+
+        thread = threading.Thread(target=run, name="slack-user-cache-warm", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(size=len(self._entries), max_size=self.max_size, ttl=self.ttl)
+        return stats
+
+
+class AsyncUserCache(UserCache):
+    """UserCache for an AsyncWebClient; get() and warm() are coroutines."""
+
+    async def get(self, user_id, client=None):
+        profile = self._lookup(user_id)
+        if profile is None:
+            profile = (await (client or self.web_client).users_info(user=user_id))["user"]
+            self.put(profile, user_id)
+        return profile
+
+    async def warm(self, page_size=200):
+        loaded = 0
+        cursor = None
+        while True:
+            page = await self.web_client.users_list(limit=page_size, cursor=cursor)
+            loaded += self._load_page(page)
+            cursor = _next_cursor(page)
+            if not cursor:
+                break
+        logging.info("Warmed user cache with %d profiles", loaded)
+        return loaded
+
+    def warm_in_background(self, page_size=200):
+        async def run():
+            try:
+                await self.warm(page_size)
+            except Exception:
+                logging.exception("User cache warm-up failed")
+
+        return asyncio.get_running_loop().create_task(run())
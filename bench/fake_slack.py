@@ -0,0 +1,120 @@
+"""Local stand-in for the Slack Web API, for offline load tests.
+
+Answers the methods the bot calls (users.info, users.list, chat.postMessage,
+auth.test, oauth.v2.access) after a configurable latency, and can answer a
+share of calls with 429 + Retry-After. Point the app at it with
+SLACK_API_URL=http://127.0.0.1:<port>/api/.
+
+    python bench/fake_slack.py --port 8999 --latency-ms 100 --ratelimit-rate 0.01
+
+GET /_stats returns call, 429 and per-(channel, user) reply counts; GET /_reset
+clears them.
+"""
+import argparse
+import asyncio
+import random
+import re
+from collections import Counter
+
+from aiohttp import web
+
+# users.info answers real_name "Bench <id>", so a reply line names its user
+REAL_NAME_PREFIX = "Bench "
+_REPLY_USER_RE = re.compile(rf"\b{REAL_NAME_PREFIX}(\w+)")
+
+
+class FakeSlack:
+    def __init__(self, latency_ms=50.0, jitter_ms=0.0, ratelimit_rate=0.0, retry_after=1, seed=0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.ratelimit_rate = ratelimit_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        # Reply lines per (channel, user named in the line); coalesced posts count once per line
+        self.replies = Counter()
+
+    def stats(self):
+        return {
+            "calls": dict(self.calls),
+            "rate_limited": dict(self.rate_limited),
+            "replies": {f"{channel}/{user}": n for (channel, user), n in self.replies.items()},
+        }
+
+    async def api(self, request):
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        await asyncio.sleep(max(0.0, delay))
+
+        if self.ratelimit_rate and self._random.random() < self.ratelimit_rate:
+            self.rate_limited[method] += 1
+            return web.json_response(
+                {"ok": False, "error": "ratelimited"},
+                status=429,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        params = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+        return web.json_response(self._respond(method, params))
+
+    def _respond(self, method, params):
+        if method == "users.info":
+            user = params.get("user", "U0")
+            return {"ok": True, "user": {"id": user, "name": user.lower(),
+                                         "real_name": f"{REAL_NAME_PREFIX}{user}"}}
+        if method == "users.list":
+            return {"ok": True, "members": [], "response_metadata": {"next_cursor": ""}}
+        if method == "chat.postMessage":
+            channel = params.get("channel")
+            for line in str(params.get("text", "")).split("\n"):
+                found = _REPLY_USER_RE.search(line)
+                self.replies[(channel, found.group(1) if found else None)] += 1
+            return {"ok": True, "channel": channel, "ts": "1.000001"}
+        if method == "auth.test":
+            return {"ok": True, "bot_id": "BBENCH", "user_id": "UBENCHBOT", "team_id": "TBENCH0"}
+        if method == "oauth.v2.access":
+            return {"ok": True, "token_type": "bot", "access_token": "xoxb-bench",
+                    "refresh_token": "xoxe-bench", "expires_in": 43200}
+        return {"ok": True}
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_route("*", "/api/{method}", self.api)
+        app.router.add_get("/_stats", self._stats)
+        app.router.add_get("/_reset", self._reset)
+        return app
+
+    async def _stats(self, request):
+        return web.json_response(self.stats())
+
+    async def _reset(self, request):
+        self.reset()
+        return web.json_response({"ok": True})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--ratelimit-rate", type=float, default=0.0,
+                        help="share of calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    fake = FakeSlack(args.latency_ms, args.jitter_ms, args.ratelimit_rate, args.retry_after)
+    web.run_app(fake.create_app(), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Signed Slack event_callback payloads for load tests.
+
+Payloads look like what Slack sends to /api/slack/events and carry valid
+X-Slack-Signature headers for the given signing secret. The mix of event
+kinds is configurable, and a share of deliveries can be replayed as Slack
+retries (same event_id, X-Slack-Retry-Num set) to exercise dedup.
+"""
+import hashlib
+import hmac
+import json
+import random
+import time
+import uuid
+
+# Relative weights of each kind of event
+DEFAULT_MIX = {
+    "hello": 0.4,           # a message the bot answers
+    "message": 0.3,         # ordinary chatter, no route matches; dropped by the pre-filter
+    "bot_message": 0.1,     # dropped by the pre-filter
+    "message_changed": 0.1, # edit, dropped by the pre-filter
+    "user_change": 0.1,     # refreshes the user cache
+}
+
+BOT_USER_ID = "UBENCHBOT"
+
+
+def sign(signing_secret, timestamp, body):
+    basestring = f"v0:{timestamp}:".encode() + body
+    digest = hmac.new(signing_secret.encode(), basestring, hashlib.sha256).hexdigest()
+    return f"v0={digest}"
+
+
+class EventGenerator:
+    """Produces (kind, event_id, channel, user, body, headers) tuples.
+
+    kind is the mix key, or "retry" for a replayed delivery; user is who
+    sent the message (None for events without one). Seeded so runs are
+    repeatable.
+    """
+
+    def __init__(self, signing_secret, mix=None, teams=1, users=200, channels=50,
+                 retry_rate=0.0, seed=0):
+        self.signing_secret = signing_secret or ""
+        mix = mix or DEFAULT_MIX
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.teams = [f"TBENCH{i}" for i in range(max(1, teams))]
+        self.users = [f"UBENCH{i}" for i in range(max(1, users))]
+        self.channels = [f"CBENCH{i}" for i in range(max(1, channels))]
+        self.retry_rate = retry_rate
+        self._random = random.Random(seed)
+        self._recent = []
+
+    def next(self):
+        if self._recent and self._random.random() < self.retry_rate:
+            return self._retry()
+
+        kind = self._random.choices(self.kinds, self.weights)[0]
+        event_id = f"Ev{uuid.UUID(int=self._random.getrandbits(128)).hex[:16].upper()}"
+        team_id = self._random.choice(self.teams)
+        channel = self._random.choice(self.channels)
+        user = self._random.choice(self.users)
+        payload = {
+            "token": "bench",
+            "team_id": team_id,
+            "api_app_id": "ABENCH",
+            "event": self._event(kind, channel, user),
+            "type": "event_callback",
+            "event_id": event_id,
+            "event_time": int(time.time()),
+            "authorizations": [{
+                "enterprise_id": None,
+                "team_id": team_id,
+                "user_id": BOT_USER_ID,
+                "is_bot": True,
+                "is_enterprise_install": False,
+            }],
+        }
+        body = json.dumps(payload).encode()
+        user = None if kind == "bot_message" else user
+        self._recent.append((kind, event_id, channel, user, body))
+        if len(self._recent) > 1000:
+            del self._recent[:500]
+        return kind, event_id, channel, user, body, self._headers(body)
+
+    def _retry(self):
+        kind, event_id, channel, user, body = self._random.choice(self._recent)
+        headers = self._headers(body)
+        headers["X-Slack-Retry-Num"] = "1"
+        headers["X-Slack-Retry-Reason"] = "http_timeout"
+        return "retry", event_id, channel, user, body, headers
+
+    def _headers(self, body):
+        timestamp = str(int(time.time()))
+        return {
+            "Content-Type": "application/json",
+            "X-Slack-Request-Timestamp": timestamp,
+            "X-Slack-Signature": sign(self.signing_secret, timestamp, body),
+        }
+
+    def _event(self, kind, channel, user):
+        ts = f"{time.time():.6f}"
+        if kind == "hello":
+            return {"type": "message", "user": user, "text": "hello", "channel": channel, "ts": ts}
+        if kind == "message":
+            return {"type": "message", "user": user, "text": "lunch?", "channel": channel, "ts": ts}
+        if kind == "bot_message":
+            return {"type": "message", "subtype": "bot_message", "bot_id": "BOTHER",
+                    "text": "beep", "channel": channel, "ts": ts}
+        if kind == "message_changed":
+            return {"type": "message", "subtype": "message_changed", "channel": channel, "ts": ts,
+                    "message": {"type": "message", "user": user, "text": "hello!"}}
+        if kind == "user_change":
+            return {"type": "user_change",
+                    "user": {"id": user, "name": user.lower(), "real_name": f"Bench {user}"}}
+        raise ValueError(f"Unknown event kind: {kind!r}")
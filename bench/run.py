@@ -0,0 +1,318 @@
+"""Offline load test for the Slack events endpoint.
+
+Starts a fake Slack Web API (fake_slack.py), launches the Flask or aiohttp
+app against it, and sends signed events (generator.py) at a fixed rate.
+Reports ack throughput, p50/p95/p99 ack latency, duplicate replies and the
+app's memory over time.
+
+    python bench/run.py --app flask --rate 100 --duration 30
+    python bench/run.py --app async --rate 500 --duration 30 --latency-ms 200
+    # an app that's already running with SLACK_API_URL=http://127.0.0.1:8999/api/
+    python bench/run.py --url http://127.0.0.1:3000 --fake-port 8999 --rate 50
+
+Latency is measured from when each request was due to be sent, so a
+server that falls behind can't hide it by slowing the sender down. Exits 1
+when --max-p99-ms or --max-duplicates is exceeded, so it can gate deploys.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import aiohttp
+from aiohttp import web
+
+from fake_slack import FakeSlack
+from generator import DEFAULT_MIX, EventGenerator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = {
+    "flask": os.path.join(ROOT, "api", "slack", "events.py"),
+    "async": os.path.join(ROOT, "api", "slack", "async_events.py"),
+}
+SIGNING_SECRET = "bench-signing-secret"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def parse_mix(text):
+    if not text:
+        return DEFAULT_MIX
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+async def start_fake_slack(args):
+    fake = FakeSlack(args.latency_ms, args.jitter_ms, args.ratelimit_rate, args.retry_after)
+    runner = web.AppRunner(fake.create_app(), access_log=None)
+    await runner.setup()
+    port = args.fake_port or free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return fake, runner, f"http://127.0.0.1:{port}/api/"
+
+
+async def wait_until_up(session, base_url, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"App exited with code {process.returncode} before it was ready")
+        try:
+            async with session.get(f"{base_url}/api/slack/events/stats") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"App at {base_url} did not come up within {timeout}s")
+
+
+def start_app(args, api_url, workdir):
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        SLACK_API_URL=api_url,
+        SLACK_BOT_TOKEN="xoxb-bench",
+        SLACK_SIGNING_SECRET=SIGNING_SECRET,
+        SLACK_CLIENT_ID="bench-client-id",
+        SLACK_CLIENT_SECRET="bench-client-secret",
+    )
+    process = subprocess.Popen(
+        [sys.executable, APPS[args.app]],
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=open(os.path.join(workdir, "app.log"), "w"),
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def sample_memory(pid, samples, started, interval=1.0):
+    while True:
+        kb = rss_kb(pid)
+        if kb is not None:
+            samples.append((time.monotonic() - started, kb))
+        await asyncio.sleep(interval)
+
+
+async def send_load(session, url, generator, rate, duration, max_inflight):
+    latencies = []
+    statuses = Counter()
+    kinds = Counter()
+    expected_replies = Counter()
+    inflight = asyncio.Semaphore(max_inflight)
+    tasks = []
+
+    async def send(due, body, headers):
+        async with inflight:
+            try:
+                async with session.post(url, data=body, headers=headers) as response:
+                    await response.read()
+                    statuses[response.status] += 1
+            except aiohttp.ClientError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.monotonic() - due)
+
+    total = int(rate * duration)
+    started = time.monotonic()
+    for i in range(total):
+        due = started + i / rate
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind, _, channel, user, body, headers = generator.next()
+        kinds[kind] += 1
+        if kind == "hello":
+            expected_replies[(channel, user)] += 1
+        tasks.append(asyncio.ensure_future(send(due, body, headers)))
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started
+    return latencies, statuses, kinds, expected_replies, elapsed
+
+
+async def wait_for_replies(fake, expected_replies, timeout):
+    expected = sum(expected_replies.values())
+    deadline = time.monotonic() + timeout
+    while sum(fake.replies.values()) < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+
+
+def summarize(args, latencies, statuses, kinds, expected_replies, elapsed, fake, memory):
+    latencies = sorted(latencies)
+    replies = fake.replies
+    # Keyed by (channel, user), so a duplicate and a missing reply in one channel don't cancel out
+    duplicates = sum(max(0, replies[key] - n) for key, n in expected_replies.items())
+    duplicates += sum(n for key, n in replies.items() if key not in expected_replies)
+    missing = sum(max(0, n - replies[key]) for key, n in expected_replies.items())
+    rss = [kb for _, kb in memory]
+    return {
+        "app": args.url or args.app,
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "ack_p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "ack_p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "ack_p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "ack_max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "events": dict(kinds),
+        "expected_replies": sum(expected_replies.values()),
+        "replies": sum(replies.values()),
+        "duplicate_replies": duplicates,
+        "missing_replies": missing,
+        "api_calls": dict(fake.calls),
+        "api_rate_limited": dict(fake.rate_limited),
+        "rss_start_kb": rss[0] if rss else None,
+        "rss_end_kb": rss[-1] if rss else None,
+        "rss_peak_kb": max(rss) if rss else None,
+        "rss_growth_kb": (rss[-1] - rss[0]) if rss else None,
+        "rss_samples": [(round(t, 1), kb) for t, kb in memory],
+    }
+
+
+def print_report(report):
+    print(f"app               {report['app']}")
+    print(f"requests          {report['requests']} in {report['elapsed_s']}s "
+          f"({report['throughput_rps']}/s)")
+    print(f"ack latency       p50 {report['ack_p50_ms']}ms  p95 {report['ack_p95_ms']}ms  "
+          f"p99 {report['ack_p99_ms']}ms  max {report['ack_max_ms']}ms")
+    print(f"statuses          {report['statuses']}")
+    print(f"events            {report['events']}")
+    print(f"replies           {report['replies']} of {report['expected_replies']} expected, "
+          f"{report['duplicate_replies']} duplicate, {report['missing_replies']} missing")
+    print(f"api calls         {report['api_calls']}  429s {report['api_rate_limited']}")
+    if report["rss_samples"]:
+        print(f"rss               start {report['rss_start_kb']}KB  end {report['rss_end_kb']}KB  "
+              f"peak {report['rss_peak_kb']}KB  growth {report['rss_growth_kb']}KB")
+        step = max(1, len(report["rss_samples"]) // 10)
+        timeline = "  ".join(f"{t}s:{kb // 1024}MB" for t, kb in report["rss_samples"][::step])
+        print(f"rss over time     {timeline}")
+
+
+async def run(args):
+    fake, fake_runner, api_url = await start_fake_slack(args)
+    workdir = tempfile.mkdtemp(prefix="slack-bench-")
+    process = None
+    memory = []
+    sampler = None
+    try:
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=args.max_inflight)
+        ) as session:
+            if args.url:
+                base_url = args.url.rstrip("/")
+            else:
+                process, base_url = start_app(args, api_url, workdir)
+            await wait_until_up(session, base_url, process)
+
+            if process is not None:
+                sampler = asyncio.ensure_future(
+                    sample_memory(process.pid, memory, time.monotonic())
+                )
+
+            generator = EventGenerator(
+                SIGNING_SECRET,
+                mix=parse_mix(args.mix),
+                teams=args.teams,
+                users=args.users,
+                channels=args.channels,
+                retry_rate=args.retry_rate,
+                seed=args.seed,
+            )
+            results = await send_load(
+                session, f"{base_url}/api/slack/events", generator,
+                args.rate, args.duration, args.max_inflight,
+            )
+            await wait_for_replies(fake, results[3], args.drain)
+            report = summarize(args, *results, fake, memory)
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        await fake_runner.cleanup()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--app", choices=sorted(APPS), default="flask",
+                        help="which entry point to launch against the fake API")
+    target.add_argument("--url", help="benchmark an already running app instead")
+    parser.add_argument("--rate", type=float, default=50.0, help="events per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--mix", help="event mix, e.g. hello=0.5,message=0.3,user_change=0.2")
+    parser.add_argument("--retry-rate", type=float, default=0.05,
+                        help="share of deliveries replayed as Slack retries")
+    parser.add_argument("--teams", type=int, default=1)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fake-port", type=int, default=0,
+                        help="port for the fake API (default: any free port)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="fake API latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--ratelimit-rate", type=float, default=0.0,
+                        help="share of fake API calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--max-inflight", type=int, default=500)
+    parser.add_argument("--drain", type=float, default=15.0,
+                        help="seconds to wait for replies after the load stops")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--max-p99-ms", type=float, help="fail if ack p99 is above this")
+    parser.add_argument("--max-duplicates", type=int, help="fail if more duplicate replies")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump(report, out, indent=2)
+
+    failures = []
+    if args.max_p99_ms is not None and report["ack_p99_ms"] > args.max_p99_ms:
+        failures.append(f"ack p99 {report['ack_p99_ms']}ms > {args.max_p99_ms}ms")
+    if args.max_duplicates is not None and report["duplicate_replies"] > args.max_duplicates:
+        failures.append(f"{report['duplicate_replies']} duplicate replies > {args.max_duplicates}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
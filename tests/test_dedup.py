@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from dedup import EventDeduplicator, MemoryEventIndex, SQLiteEventIndex, extract_event_id
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_index(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemoryEventIndex(**kwargs)
+        return SQLiteEventIndex(str(tmp_path / "events.db"), **kwargs)
+    return make
+
+
+def test_records_and_detects_repeats(make_index):
+    index = make_index()
+    assert index.seen("Ev1") is False
+    assert index.seen("Ev1") is True
+    assert index.seen("Ev2") is False
+    assert len(index) == 2
+
+
+def test_entries_expire_after_the_window(make_index):
+    index = make_index(window=0.05)
+    assert index.seen("Ev1") is False
+    time.sleep(0.1)
+    # Past the window the id counts as new and is recorded again
+    assert index.seen("Ev1") is False
+    assert index.seen("Ev1") is True
+
+
+def test_forget_lets_the_next_delivery_through(make_index):
+    index = make_index()
+    index.seen("Ev1")
+    index.forget("Ev1")
+    assert index.seen("Ev1") is False
+    assert index.seen("Ev1") is True
+
+
+def test_memory_index_evicts_oldest_past_max_entries():
+    index = MemoryEventIndex(max_entries=2)
+    for event_id in ("Ev1", "Ev2", "Ev3"):
+        index.seen(event_id)
+    assert len(index) == 2
+    assert index.seen("Ev3") is True
+    assert index.seen("Ev1") is False
+
+
+def test_memory_index_re_recorded_id_survives_its_stale_entry():
+    index = MemoryEventIndex(window=0.1)
+    index.seen("Ev1")
+    index.forget("Ev1")
+    time.sleep(0.06)
+    index.seen("Ev1")
+    time.sleep(0.06)
+    # The first record's ring-buffer entry has expired; the second is still in the window
+    assert index.seen("Ev2") is False
+    assert index.seen("Ev1") is True
+
+
+def test_memory_index_stale_entry_does_not_count_against_max_entries():
+    index = MemoryEventIndex(max_entries=2)
+    index.seen("Ev1")
+    index.forget("Ev1")
+    index.seen("Ev1")
+    index.seen("Ev2")
+    assert len(index) == 2
+    assert index.seen("Ev1") is True
+    assert index.seen("Ev2") is True
+
+
+def test_sqlite_index_prunes_to_max_entries(tmp_path):
+    index = SQLiteEventIndex(str(tmp_path / "events.db"), max_entries=2, prune_every=1)
+    for event_id in ("Ev1", "Ev2", "Ev3"):
+        index.seen(event_id)
+        time.sleep(0.01)
+    assert len(index) == 2
+    assert index.seen("Ev1") is False
+
+
+def test_sqlite_index_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "events.db")
+    assert SQLiteEventIndex(path).seen("Ev1") is False
+    assert SQLiteEventIndex(path).seen("Ev1") is True
+
+
+def test_deduplicator_counts_and_forgets():
+    deduplicator = EventDeduplicator(MemoryEventIndex())
+    body = b'{"type": "event_callback", "event_id": "Ev1", "event": {}}'
+    retry = {"X-Slack-Retry-Num": "1", "X-Slack-Retry-Reason": "http_timeout"}
+
+    assert extract_event_id(body) == "Ev1"
+    assert deduplicator.is_duplicate(body, {}) is False
+    deduplicator.forget(body)
+    assert deduplicator.is_duplicate(body, retry) is False
+    assert deduplicator.is_duplicate(body, retry) is True
+
+    stats = deduplicator.stats()
+    assert stats["duplicates"] == 1
+    assert stats["forgotten"] == 1
+    assert stats["retry_reasons"] == {"http_timeout": 2}
@@ -0,0 +1,42 @@
+import threading
+import time
+
+from dispatcher import EventDispatcher
+
+
+def test_every_accepted_event_is_handled_across_shutdown():
+    handled = []
+    dispatcher = EventDispatcher(handled.append, workers=2, max_queue=10000)
+    dispatcher.start()
+    accepted = []
+
+    def submit_many(offset):
+        for i in range(2000):
+            if dispatcher.submit(offset + i):
+                accepted.append(offset + i)
+
+    submitters = [threading.Thread(target=submit_many, args=(n * 10000,)) for n in range(4)]
+    for thread in submitters:
+        thread.start()
+    time.sleep(0.01)
+    dispatcher.shutdown(timeout=10.0)
+    for thread in submitters:
+        thread.join()
+
+    # Nothing accepted may land behind the stop sentinels and be dropped silently
+    assert sorted(handled) == sorted(accepted)
+    stats = dispatcher.stats()
+    assert stats["submitted"] == stats["processed"] == len(accepted)
+
+
+def test_shutdown_from_a_thread_holding_the_lock_times_out_instead_of_deadlocking():
+    dispatcher = EventDispatcher(lambda payload: None, workers=1)
+    dispatcher.start()
+
+    # What a signal handler sees when it interrupts submit() on the main thread
+    with dispatcher._lock:
+        dispatcher._submitting += 1
+        started = time.monotonic()
+        dispatcher.shutdown(timeout=0.2)
+        dispatcher._submitting -= 1
+    assert time.monotonic() - started < 2.0
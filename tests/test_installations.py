@@ -0,0 +1,69 @@
+import threading
+from types import SimpleNamespace
+
+from installations import TeamClients
+from outbound import OutboundScheduler
+from test_outbound import wait_for
+
+
+class Store:
+    def find_bot(self, enterprise_id, team_id, is_enterprise_install=False):
+        return SimpleNamespace(team_id=team_id, bot_token=f"xoxb-{team_id}",
+                               bot_token_expires_at=None, bot_refresh_token=None)
+
+
+class RecordingClient:
+    def __init__(self, token):
+        self.token = token
+        self.posted = []
+        self._lock = threading.Lock()
+
+    def chat_postMessage(self, channel, text, **kwargs):
+        with self._lock:
+            self.posted.append((channel, text))
+        return {"ok": True}
+
+
+def make_team_clients(**kwargs):
+    return TeamClients(
+        Store(),
+        RecordingClient,
+        wrap=lambda web_client: OutboundScheduler(web_client, senders=1, coalesce=False),
+        **kwargs,
+    )
+
+
+def test_evicted_client_stays_open_while_leased():
+    team_clients = make_team_clients(max_size=1)
+    try:
+        with team_clients.lease(None, "TA") as client_a:
+            # TB pushes TA out of the one-slot cache while a handler still holds it
+            assert team_clients.get(None, "TB") is not None
+            client_a.post_message(channel="C1", text="hello")
+            assert team_clients.stats()["retired"] == 1
+
+        assert wait_for(lambda: client_a.client.posted == [("C1", "hello")])
+        assert wait_for(lambda: client_a._closed)
+        assert team_clients.stats()["retired"] == 0
+    finally:
+        team_clients.shutdown()
+
+
+def test_reinstall_keeps_leased_client_open():
+    team_clients = make_team_clients()
+    try:
+        with team_clients.lease(None, "TA") as old:
+            team_clients.invalidate(None, "TA")
+            old.post_message(channel="C1", text="hello")
+            assert team_clients.get(None, "TA") is not old
+        assert wait_for(lambda: old.client.posted == [("C1", "hello")])
+    finally:
+        team_clients.shutdown()
+
+
+def test_shutdown_closes_leased_and_cached_clients():
+    team_clients = make_team_clients(max_size=1)
+    with team_clients.lease(None, "TA") as client_a:
+        client_b = team_clients.get(None, "TB")
+    team_clients.shutdown()
+    assert client_a._closed and client_b._closed
@@ -0,0 +1,31 @@
+import re
+
+from metrics import Registry, StatsGauges
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="[^"]*"(,[a-zA-Z_][a-zA-Z0-9_]*="[^"]*")*\})? \S+$')
+
+
+def test_per_method_stats_become_labels():
+    registry = Registry()
+    StatsGauges(
+        "slack_transport",
+        lambda: {"users_info": {"calls": 2, "avg_total_ms": 1.5}, "chat_postMessage": {"calls": 1}},
+        label="method",
+        registry=registry,
+    )
+    lines = registry.render().splitlines()
+
+    assert 'slack_transport_calls{method="users_info"} 2' in lines
+    assert 'slack_transport_calls{method="chat_postMessage"} 1' in lines
+    assert 'slack_transport_avg_total_ms{method="users_info"} 1.5' in lines
+
+
+def test_rendered_names_are_valid():
+    registry = Registry()
+    StatsGauges("slack_dedup", lambda: {"checked": 1, "retry-reasons": {"http_timeout": 2}},
+                registry=registry)
+    StatsGauges("slack_queue", lambda: {"2xx.count": 3}, registry=registry)
+
+    for line in registry.render().splitlines():
+        if line and not line.startswith("#"):
+            assert SAMPLE.match(line), line
@@ -0,0 +1,76 @@
+import threading
+import time
+from urllib.error import URLError
+
+from outbound import OutboundScheduler, parse_tier_rates
+
+
+class FlakyClient:
+    """chat_postMessage fails with a connection error the first time only."""
+
+    def __init__(self):
+        self.posted = []
+        self.failures = 1
+        self._lock = threading.Lock()
+
+    def chat_postMessage(self, channel, text, **kwargs):
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise URLError("connection reset")
+            self.posted.append((channel, text))
+        return {"ok": True}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_sender_survives_connection_error():
+    client = FlakyClient()
+    scheduler = OutboundScheduler(client, senders=1, coalesce=False)
+    try:
+        scheduler.post_message(channel="C1", text="lost")
+        assert wait_for(lambda: scheduler.stats()["failed"] == 1)
+
+        scheduler.post_message(channel="C2", text="delivered")
+        assert wait_for(lambda: client.posted == [("C2", "delivered")])
+        assert all(thread.is_alive() for thread in scheduler._senders)
+        stats = scheduler.stats()
+        assert stats["sent"] == 1
+        assert stats["depth"] == 0
+    finally:
+        scheduler.shutdown()
+
+
+class CountingClient:
+    def __init__(self):
+        self.calls = 0
+
+    def users_info(self, user):
+        self.calls += 1
+        return {"ok": True, "user": {"id": user}}
+
+
+def test_tier_budget_is_available_as_a_burst():
+    client = CountingClient()
+    scheduler = OutboundScheduler(client, senders=1, tier_rates=parse_tier_rates("4=120"))
+    try:
+        started = time.monotonic()
+        for i in range(120):
+            scheduler.users_info(user=f"U{i}")
+        assert client.calls == 120
+        assert time.monotonic() - started < 1.0
+        assert scheduler.stats()["avg_throttle_wait_ms"] == 0.0
+    finally:
+        scheduler.shutdown()
+
+
+def test_parse_tier_rates_keeps_unlisted_tiers():
+    assert parse_tier_rates("2=40, 4=200") == {1: 1, 2: 40.0, 3: 50, 4: 200.0}
+    assert parse_tier_rates("") == {1: 1, 2: 20, 3: 50, 4: 100}
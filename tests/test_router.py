@@ -0,0 +1,22 @@
+from router import EventRouter
+
+
+def callback(event):
+    return {"type": "event_callback", "event": event}
+
+
+def test_accepts_drops_messages_no_exact_route_matches():
+    router = EventRouter()
+    router.add(lambda event, match: None, "message", text="hello")
+
+    assert router.accepts(callback({"type": "message", "text": "Hello"}))
+    assert not router.accepts(callback({"type": "message", "text": "lunch?"}))
+    assert not router.accepts(callback({"type": "message"}))
+
+
+def test_accepts_keeps_messages_when_a_pattern_route_exists():
+    router = EventRouter()
+    router.add(lambda event, match: None, "message", text="hello")
+    router.add(lambda event, match: None, "message", pattern=r"^deploy (\w+)")
+
+    assert router.accepts(callback({"type": "message", "text": "lunch?"}))
@@ -0,0 +1,27 @@
+import time
+
+from transport import PooledWebClient, api_method_name
+
+
+def test_idle_clients_do_not_clear_a_shared_busy_pool():
+    busy = PooledWebClient(idle_timeout=0.2)
+    quiet = PooledWebClient(pool=busy.pool, timings=busy.timings)
+    cleared = []
+    busy.pool.clear = lambda: cleared.append(True)
+
+    # The quiet client hasn't been used for longer than idle_timeout, the pool has
+    for _ in range(3):
+        time.sleep(0.1)
+        busy.pool.touch()
+    quiet.pool.touch()
+    assert cleared == []
+
+    time.sleep(0.3)
+    quiet.pool.touch()
+    assert cleared == [True]
+
+
+def test_method_names_match_the_webclient_methods():
+    assert api_method_name("https://slack.com/api/users.info") == "users_info"
+    assert api_method_name("https://slack.com/api/chat.postMessage") == "chat_postMessage"
+    assert api_method_name("http://127.0.0.1:8999/api/oauth.v2.access") == "oauth_v2_access"
@@ -0,0 +1,76 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import URLError
+
+import pytest
+from slack_sdk.http_retry import ConnectionErrorRetryHandler
+
+from transport import PooledWebClient
+
+
+class SlowSlack(BaseHTTPRequestHandler):
+    requests = 0
+
+    def do_POST(self):
+        SlowSlack.requests += 1
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(0.8)
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_slack():
+    SlowSlack.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowSlack)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_read_timeout_is_not_retried(slow_slack):
+    client = PooledWebClient(
+        token="xoxb-test",
+        base_url=slow_slack,
+        timeout=0.3,
+        retry_handlers=[ConnectionErrorRetryHandler(max_retry_count=2)],
+    )
+
+    with pytest.raises(TimeoutError):
+        client.chat_postMessage(channel="C1", text="hello")
+    assert SlowSlack.requests == 1
+
+
+def test_connection_refused_is_retried():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    retried = []
+
+    class CountingHandler(ConnectionErrorRetryHandler):
+        def _can_retry(self, **kwargs):
+            retried.append(kwargs["error"])
+            return super()._can_retry(**kwargs)
+
+    client = PooledWebClient(
+        token="xoxb-test",
+        base_url=f"http://127.0.0.1:{port}/api/",
+        timeout=0.3,
+        retry_handlers=[CountingHandler(max_retry_count=2)],
+    )
+
+    with pytest.raises(URLError):
+        client.chat_postMessage(channel="C1", text="hello")
+    assert len(retried) == 2